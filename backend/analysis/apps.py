@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class AnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'analysis' 
\ No newline at end of file
+    name = 'analysis'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0003_initial'),
+        ('competitors', '0009_competitor_competitor_owner_updated_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['created_by', '-created_at'], name='analysis_owner_created'),
+        ),
+    ]
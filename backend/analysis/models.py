@@ -18,4 +18,7 @@ class Analysis(models.Model):
     
     class Meta:
         verbose_name_plural = "Analyses"
-        ordering = ['-created_at'] 
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_by', '-created_at'], name='analysis_owner_created'),
+        ] 
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+JSON Merge Patch (RFC 7396) and JSON Patch (RFC 6902) for Analysis.
+"""
+import copy
+
+_MISSING = object()
+
+
+class PatchError(ValueError):
+    pass
+
+
+def merge_patch(target, patch):
+    """
+    Apply an RFC 7396 merge patch and return the result.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _parse_pointer(pointer):
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise PatchError(f'Invalid JSON pointer: {pointer!r}')
+    if pointer == '':
+        return []
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _list_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith('0')):
+        raise PatchError(f'Invalid array index: {token!r}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f'Array index out of range: {token}')
+    return index
+
+
+def _resolve(document, parts):
+    """
+    Return the container holding the last path segment.
+    """
+    node = document
+    for token in parts[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise PatchError(f'Path not found: /{token}')
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_list_index(node, token)]
+        else:
+            raise PatchError(f'Cannot traverse into {type(node).__name__}')
+    return node
+
+
+def _get(document, parts):
+    if not parts:
+        return document
+    container = _resolve(document, parts)
+    token = parts[-1]
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchError(f'Path not found: {token}')
+        return container[token]
+    if isinstance(container, list):
+        return container[_list_index(container, token)]
+    raise PatchError(f'Cannot read from {type(container).__name__}')
+
+
+def _remove(document, parts):
+    if not parts:
+        raise PatchError('Cannot remove the whole document')
+    container = _resolve(document, parts)
+    token = parts[-1]
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchError(f'Path not found: {token}')
+        return container.pop(token)
+    if isinstance(container, list):
+        return container.pop(_list_index(container, token))
+    raise PatchError(f'Cannot remove from {type(container).__name__}')
+
+
+def _add(document, parts, value):
+    if not parts:
+        raise PatchError('Cannot replace the whole document')
+    container = _resolve(document, parts)
+    token = parts[-1]
+    if isinstance(container, dict):
+        container[token] = value
+    elif isinstance(container, list):
+        container.insert(_list_index(container, token, allow_end=True), value)
+    else:
+        raise PatchError(f'Cannot add to {type(container).__name__}')
+
+
+def apply_json_patch(document, operations):
+    """
+    Apply RFC 6902 operations to a copy of document and return it. The
+    patch is atomic: any failing operation raises PatchError and nothing is
+    applied.
+    """
+    if not isinstance(operations, list):
+        raise PatchError('A JSON Patch document must be an array of operations')
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise PatchError('Each operation needs "op" and "path"')
+        op = operation['op']
+        parts = _parse_pointer(operation['path'])
+        value = operation.get('value', _MISSING)
+        if op in ('add', 'replace', 'test') and value is _MISSING:
+            raise PatchError(f'"{op}" operation needs a "value"')
+
+        if op == 'add':
+            _add(document, parts, copy.deepcopy(value))
+        elif op == 'remove':
+            _remove(document, parts)
+        elif op == 'replace':
+            _remove(document, parts)
+            _add(document, parts, copy.deepcopy(value))
+        elif op in ('move', 'copy'):
+            source = _parse_pointer(operation.get('from'))
+            if op == 'move':
+                if parts[:len(source)] == source and parts != source:
+                    raise PatchError('Cannot move a value into one of its children')
+                moved = _remove(document, source)
+            else:
+                moved = copy.deepcopy(_get(document, source))
+            _add(document, parts, moved)
+        elif op == 'test':
+            if _get(document, parts) != value:
+                raise PatchError(f'Test failed at {operation["path"]}')
+        else:
+            raise PatchError(f'Unknown operation: {op!r}')
+    return document
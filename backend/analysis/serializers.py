@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from competitors.models import Competitor
 from .models import Analysis
 
 class AnalysisSerializer(serializers.ModelSerializer):
@@ -13,4 +14,14 @@ class AnalysisSerializer(serializers.ModelSerializer):
             'competitors',
             'data',
         ]
-        read_only_fields = ['created_at', 'updated_at'] 
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None:
+            # Analyses may only link the requesting user's competitors.
+            fields['competitors'].child_relation.queryset = Competitor.objects.filter(
+                created_by=request.user
+            )
+        return fields 
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rivalradar.response_cache import invalidate
+from .models import Analysis
+
+
+@receiver(post_save, sender=Analysis)
+@receiver(post_delete, sender=Analysis)
+def invalidate_analysis_responses(sender, instance, **kwargs):
+    invalidate('analyses', user_id=instance.created_by_id)
+
+
+@receiver(m2m_changed, sender=Analysis.competitors.through)
+def invalidate_analysis_competitor_responses(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # instance is a Competitor; invalidate the owners of the affected analyses.
+        owners = set(Analysis.objects.filter(pk__in=pk_set or []).values_list('created_by_id', flat=True))
+        owners.add(instance.created_by_id)
+    else:
+        owners = {instance.created_by_id}
+    for owner_id in owners:
+        invalidate('analyses', user_id=owner_id)
@@ -0,0 +1,206 @@
+import json
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from competitors.models import Competitor
+from .models import Analysis
+from .patching import PatchError, apply_json_patch, merge_patch
+from .views import AnalysisViewSet
+
+User = get_user_model()
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def make_competitor(user, name='Acme'):
+    return Competitor.objects.create(
+        name=name, description='', website='https://example.com', market_position='Leader', created_by=user,
+    )
+
+
+class MergePatchTests(SimpleTestCase):
+    def test_merges_nested_objects_and_removes_nulls(self):
+        target = {'a': 1, 'b': {'c': 2, 'd': 3}, 'e': [1, 2]}
+        patch = {'a': None, 'b': {'c': 4}, 'e': [3], 'f': {'g': None}}
+        self.assertEqual(merge_patch(target, patch), {'b': {'c': 4, 'd': 3}, 'e': [3], 'f': {}})
+        self.assertEqual(target['b'], {'c': 2, 'd': 3})
+
+    def test_non_object_patch_replaces_target(self):
+        self.assertEqual(merge_patch({'a': 1}, ['x']), ['x'])
+
+
+class JSONPatchTests(SimpleTestCase):
+    def test_applies_operations_in_order(self):
+        document = {'data': {'scores': [1, 2]}, 'competitors': [1]}
+        result = apply_json_patch(document, [
+            {'op': 'add', 'path': '/data/scores/-', 'value': 3},
+            {'op': 'replace', 'path': '/data/scores/0', 'value': 0},
+            {'op': 'copy', 'from': '/data/scores', 'path': '/data/backup'},
+            {'op': 'move', 'from': '/data/backup', 'path': '/data/history'},
+            {'op': 'remove', 'path': '/competitors/0'},
+            {'op': 'test', 'path': '/data/scores/2', 'value': 3},
+            {'op': 'add', 'path': '/data/a~1b', 'value': True},
+        ])
+        self.assertEqual(result, {
+            'data': {'scores': [0, 2, 3], 'history': [0, 2, 3], 'a/b': True},
+            'competitors': [],
+        })
+        self.assertEqual(document['data']['scores'], [1, 2])
+
+    def test_failing_operation_applies_nothing(self):
+        document = {'data': {'a': 1}}
+        for operations in (
+            [{'op': 'remove', 'path': '/data/a'}, {'op': 'test', 'path': '/data/a', 'value': 1}],
+            [{'op': 'add', 'path': '/data/list/0', 'value': 1}],
+            [{'op': 'replace', 'path': '/data/a'}],
+            [{'op': 'move', 'from': '/data', 'path': '/data/inner'}],
+            [{'op': 'frobnicate', 'path': '/data'}],
+            {'op': 'add'},
+        ):
+            with self.subTest(operations=operations), self.assertRaises(PatchError):
+                apply_json_patch(document, operations)
+        self.assertEqual(document, {'data': {'a': 1}})
+
+
+class PatchDataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.acme = make_competitor(self.user, 'Acme')
+        self.globex = make_competitor(self.user, 'Globex')
+        self.analysis = Analysis.objects.create(
+            title='Market', description='', created_by=self.user,
+            data={'scores': {'price': 3, 'support': 4}, 'notes': 'draft'},
+        )
+        self.analysis.competitors.add(self.acme)
+        self.url = f'/api/analysis/{self.analysis.pk}/patch_data/'
+
+    def patch(self, body, content_type):
+        return self.client.patch(self.url, json.dumps(body), content_type=content_type)
+
+    def test_merge_patch_updates_data_and_links(self):
+        response = self.patch(
+            {'data': {'scores': {'price': 5}, 'notes': None}, 'competitors': [self.globex.pk]},
+            'application/merge-patch+json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], {'scores': {'price': 5, 'support': 4}})
+        self.assertEqual(response.data['competitors'], [self.globex.pk])
+
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.data, {'scores': {'price': 5, 'support': 4}})
+
+    def test_json_patch_updates_data_and_links(self):
+        response = self.patch(
+            [
+                {'op': 'replace', 'path': '/data/notes', 'value': 'final'},
+                {'op': 'add', 'path': '/competitors/-', 'value': self.globex.pk},
+            ],
+            'application/json-patch+json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['notes'], 'final')
+        self.assertEqual(sorted(response.data['competitors']), [self.acme.pk, self.globex.pk])
+
+    def test_json_patch_applies_to_the_current_row(self):
+        # Another request changes the row after this one loaded it.
+        stale = Analysis.objects.get(pk=self.analysis.pk)
+        Analysis.objects.filter(pk=self.analysis.pk).update(data={'scores': {'price': 3}, 'notes': 'edited'})
+
+        with mock.patch.object(AnalysisViewSet, 'get_object', return_value=stale):
+            response = self.patch(
+                [
+                    {'op': 'test', 'path': '/data/notes', 'value': 'edited'},
+                    {'op': 'replace', 'path': '/data/scores/price', 'value': 5},
+                ],
+                'application/json-patch+json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.data, {'scores': {'price': 5}, 'notes': 'edited'})
+
+    def test_rejects_other_fields_and_foreign_competitors(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        foreign = make_competitor(other, 'Initech')
+
+        response = self.patch({'title': 'Renamed'}, 'application/merge-patch+json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.patch({'competitors': [foreign.pk]}, 'application/merge-patch+json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.patch([{'op': 'remove', 'path': '/data'}], 'application/json-patch+json')
+        self.assertEqual(response.status_code, 400)
+
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.title, 'Market')
+        self.assertEqual(list(self.analysis.competitors.all()), [self.acme])
+
+
+class MultiGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.analyses = [
+            Analysis.objects.create(title=f'Analysis {index}', description='', created_by=self.user)
+            for index in range(3)
+        ]
+
+    def test_returns_objects_in_requested_order(self):
+        first, second, third = self.analyses
+        response = self.client.get('/api/analysis/', {'ids': f'{third.pk},{first.pk},999,{third.pk}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [third.pk, first.pk])
+
+    def test_skips_other_users_objects(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        foreign = Analysis.objects.create(title='Foreign', description='', created_by=other)
+        response = self.client.get('/api/analysis/', {'ids': f'{foreign.pk},{self.analyses[0].pk}'})
+        self.assertEqual([item['id'] for item in response.data], [self.analyses[0].pk])
+
+    def test_rejects_invalid_ids(self):
+        self.assertEqual(self.client.get('/api/analysis/', {'ids': '1,two'}).status_code, 400)
+        too_many = ','.join(str(pk) for pk in range(1, 200))
+        self.assertEqual(self.client.get('/api/analysis/', {'ids': too_many}).status_code, 400)
+
+
+class OwnerScopingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.other = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.own = Analysis.objects.create(title='Mine', description='', created_by=self.user)
+        self.foreign = Analysis.objects.create(title='Theirs', description='', created_by=self.other)
+
+    def test_list_only_includes_own_analyses(self):
+        response = self.client.get('/api/analysis/')
+        self.assertEqual([item['title'] for item in response.data['results']], ['Mine'])
+
+    def test_other_users_analyses_are_not_found(self):
+        url = f'/api/analysis/{self.foreign.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.put(url, {'title': 'Mine now', 'description': ''}, format='json').status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertTrue(Analysis.objects.filter(pk=self.foreign.pk, title='Theirs').exists())
+
+    def test_cannot_link_other_users_competitors(self):
+        foreign = make_competitor(self.other, 'Initech')
+        response = self.client.post(
+            '/api/analysis/', {'title': 'New', 'description': '', 'competitors': [foreign.pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('competitors', response.data)
+
+        response = self.client.put(
+            f'/api/analysis/{self.own.pk}/',
+            {'title': 'Mine', 'description': '', 'competitors': [foreign.pk]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.own.competitors.exists())
@@ -1,18 +1,142 @@
-from rest_framework import viewsets, permissions
+import json
+from django.db import connection, transaction
+from django.db.models import F, Func, JSONField, Value
+from django.db.models.signals import post_save
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from competitors.models import Competitor
 from .models import Analysis
+from .patching import PatchError, apply_json_patch, merge_patch
 from .serializers import AnalysisSerializer
+from rivalradar.mixins import MultiGetMixin
+from rivalradar.response_cache import cached_response
 
-class AnalysisViewSet(viewsets.ModelViewSet):
-    queryset = Analysis.objects.all()
+# Database functions implementing RFC 7396 merge patch on JSON columns.
+MERGE_PATCH_FUNCTIONS = {
+    'sqlite': 'json_patch',
+    'mysql': 'JSON_MERGE_PATCH',
+}
+
+
+class MergePatchParser(JSONParser):
+    media_type = 'application/merge-patch+json'
+
+
+class JSONPatchParser(JSONParser):
+    media_type = 'application/json-patch+json'
+
+
+class AnalysisViewSet(MultiGetMixin, viewsets.ModelViewSet):
+    queryset = Analysis.objects.prefetch_related('competitors')
     serializer_class = AnalysisSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return super().get_queryset().filter(created_by=self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
-        
+
+    @action(detail=True, methods=['patch'], parser_classes=[MergePatchParser, JSONPatchParser, JSONParser])
+    def patch_data(self, request, pk=None):
+        """
+        Partially update data and competitors without resending them.
+
+        application/json-patch+json takes RFC 6902 operations on the document
+        {"data": ..., "competitors": [...]}. application/merge-patch+json (or
+        plain JSON) takes {"data": <RFC 7396 merge patch>, "competitors": [ids]}.
+        Only the competitor links that changed are added or removed.
+        """
+        analysis = self.get_object()
+        with transaction.atomic():
+            # Lock the row so JSON Patch operations, including test, run
+            # against the current document and concurrent patches serialize.
+            analysis = Analysis.objects.select_for_update().get(pk=analysis.pk)
+            error = self.apply_patch(request, analysis)
+        if error is not None:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        analysis = self.get_queryset().get(pk=analysis.pk)
+        return Response(self.get_serializer(analysis).data)
+
+    def apply_patch(self, request, analysis):
+        """
+        Apply a patch_data request to the locked analysis. Returns an error
+        message if the patch is invalid; nothing is written in that case.
+        """
+        competitor_ids = list(analysis.competitors.values_list('pk', flat=True))
+
+        try:
+            if request.content_type.startswith(JSONPatchParser.media_type):
+                document = apply_json_patch(
+                    {'data': analysis.data, 'competitors': competitor_ids}, request.data
+                )
+                if set(document) != {'data', 'competitors'}:
+                    raise PatchError('Only /data and /competitors can be patched')
+                data_patch = None
+                new_data = document['data']
+                new_competitors = document['competitors']
+            else:
+                if not isinstance(request.data, dict) or set(request.data) - {'data', 'competitors'}:
+                    raise PatchError('Only data and competitors can be patched')
+                data_patch = request.data.get('data')
+                new_data = None
+                new_competitors = request.data.get('competitors', competitor_ids)
+
+            if not isinstance(new_competitors, list) or not all(isinstance(pk, int) for pk in new_competitors):
+                raise PatchError('competitors must be a list of competitor ids')
+        except PatchError as e:
+            return str(e)
+
+        wanted = set(new_competitors)
+        current = set(competitor_ids)
+        if wanted - current:
+            found = Competitor.objects.filter(
+                pk__in=wanted - current, created_by=request.user
+            ).count()
+            if found != len(wanted - current):
+                return 'Unknown competitor ids'
+
+        if data_patch is not None:
+            self.apply_merge_patch(analysis, data_patch)
+        elif new_data is not None and new_data != analysis.data:
+            analysis.data = new_data
+            analysis.save(update_fields=['data', 'updated_at'])
+        if current - wanted:
+            analysis.competitors.remove(*(current - wanted))
+        if wanted - current:
+            analysis.competitors.add(*(wanted - current))
+        return None
+
+    def apply_merge_patch(self, analysis, patch):
+        """
+        Merge-patch Analysis.data in the database where the backend has a
+        native merge-patch function, otherwise in Python. The caller holds
+        the row lock.
+        """
+        function = MERGE_PATCH_FUNCTIONS.get(connection.vendor)
+        if function is not None and isinstance(patch, dict):
+            Analysis.objects.filter(pk=analysis.pk).update(
+                data=Func(F('data'), Value(json.dumps(patch)), function=function, output_field=JSONField()),
+                updated_at=timezone.now(),
+            )
+            # update() bypasses signals; cache invalidation and the changes
+            # feed rely on them.
+            post_save.send(
+                sender=Analysis, instance=analysis, created=False,
+                update_fields=frozenset(['data', 'updated_at']), raw=False,
+                using=connection.alias,
+            )
+            return
+
+        analysis.data = merge_patch(analysis.data, patch)
+        analysis.save(update_fields=['data', 'updated_at'])
+
     @action(detail=False, methods=['get'])
+    @cached_response('dashboard_data', depends_on=['analyses'])
     def dashboard_data(self, request):
         """
         Return mock data for the dashboard visualization.
@@ -25,4 +149,4 @@ class AnalysisViewSet(viewsets.ModelViewSet):
             {"category": "Pricing", "yourCompany": 60, "competitors": 75},
             {"category": "Customer Satisfaction", "yourCompany": 88, "competitors": 72}
         ]
-        return Response(data) 
\ No newline at end of file
+        return Response(data)
@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import Competitor, CompetitorAnalysis
+from .models import AICall, AnalysisRollup, CompanyComparison, Competitor, CompetitorAnalysis, CompetitorAnalysisSummary, IdempotencyKey, SwotTerm
 
 admin.site.register(Competitor)
-admin.site.register(CompetitorAnalysis) 
\ No newline at end of file
+admin.site.register(CompetitorAnalysis)
+admin.site.register(CompetitorAnalysisSummary)
+admin.site.register(CompanyComparison)
+admin.site.register(AnalysisRollup)
+admin.site.register(AICall)
+admin.site.register(SwotTerm)
+admin.site.register(IdempotencyKey)
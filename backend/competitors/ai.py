@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import threading
+import time
+import google.generativeai as genai
+from django.conf import settings
+from users.quotas import check_quota, record_usage
+from .models import AICall
+from .prompts import count_tokens
+
+# Initialize the Gemini model
+genai.configure(api_key=settings.GEMINI_API_KEY)  # Get API key from Django settings
+model = genai.GenerativeModel('gemini-pro')
+
+SYSTEM_FLOW = 'system'
+
+
+def usage(prompt, response):
+    """
+    Return (prompt_tokens, completion_tokens) for a call, as reported by
+    Gemini when available and counted locally otherwise.
+    """
+    metadata = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(metadata, 'prompt_token_count', 0)
+    completion_tokens = getattr(metadata, 'candidates_token_count', 0)
+    return (
+        prompt_tokens or count_tokens(prompt),
+        completion_tokens or count_tokens(response.text),
+    )
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing in front of the Gemini client.
+
+    Each user is a flow. A request gets a virtual start tag of
+    max(virtual time, the flow's previous finish tag), and its finish tag
+    advances by cost / weight. Free slots go to the smallest start tag, so
+    a user who has queued many requests waits behind users who have
+    queued few, and higher-weight roles advance more slowly.
+    """
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self._condition = threading.Condition()
+        self._queue = []
+        self._active = 0
+        self._virtual_time = 0.0
+        self._finish_tags = {}
+        self._sequence = itertools.count()
+
+    def acquire(self, flow, weight, cost):
+        with self._condition:
+            start = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+            self._finish_tags[flow] = start + cost / weight
+            ticket = (start, next(self._sequence))
+            heapq.heappush(self._queue, ticket)
+
+            while self._active >= self.concurrency or self._queue[0] != ticket:
+                self._condition.wait()
+
+            heapq.heappop(self._queue)
+            self._active += 1
+            self._virtual_time = start
+            # Forget flows that are idle; they restart at the current virtual time.
+            if not self._queue:
+                self._finish_tags = {
+                    key: tag for key, tag in self._finish_tags.items() if tag > start
+                }
+            self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def queue_depth(self):
+        with self._condition:
+            return len(self._queue)
+
+
+scheduler = FairScheduler(settings.LLM_MAX_CONCURRENCY)
+
+
+def generate(prompt, user=None, charge_to=None, action=''):
+    """
+    Send a prompt to Gemini and return the text of the response.
+
+    The call is scheduled fairly between users, weighted by role, and
+    counted against the daily quota of user, or split between the users in
+    charge_to when one prompt serves several users. Its token usage and
+    latency are recorded as an AICall labelled with action.
+    """
+    users = charge_to if charge_to is not None else [user]
+    for each in users:
+        check_quota(each)
+
+    if user is not None and user.is_authenticated:
+        flow = user.pk
+        weight = settings.LLM_ROLE_WEIGHTS.get(user.role, 1)
+    else:
+        flow = SYSTEM_FLOW
+        weight = 1
+
+    scheduler.acquire(flow, weight, count_tokens(prompt))
+    try:
+        started = time.perf_counter()
+        response = model.generate_content(prompt)
+        latency = time.perf_counter() - started
+    finally:
+        scheduler.release()
+
+    text = response.text
+    prompt_tokens, completion_tokens = usage(prompt, response)
+    AICall.objects.create(
+        action=action,
+        user=user if user is not None and user.is_authenticated else None,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency_ms=round(latency * 1000),
+    )
+    share = max(len(users), 1)
+    for each in users:
+        record_usage(each, prompt_tokens // share, completion_tokens // share)
+    return text
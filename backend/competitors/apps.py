@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class CompetitorsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'competitors' 
\ No newline at end of file
+    name = 'competitors'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.conf import settings
+from rivalradar.db import closing_connections
+from .ai import generate
+from .extraction import BATCH_COMPANY_SCHEMA, COMPANY_SCHEMA, extract_company_batch, is_valid
+from .prompts import build_company_batch_prompt
+from .services import fetch_company_data
+
+
+def _query_key(name):
+    return name.casefold().strip()
+
+
+class FetchBatcher:
+    """
+    Collect fetch_from_ai requests for a short window and send them to
+    Gemini as one multi-company prompt.
+
+    Callers get a Future that resolves to the company data for their name.
+    Items are matched to callers by their query echo, ignoring case and
+    surrounding whitespace. Items missing from the batched reply, or
+    malformed, are retried with a single-company prompt.
+    """
+
+    def __init__(self, window=0.05, max_size=8, workers=4):
+        self.window = window
+        self.max_size = max_size
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch-batch')
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, company_name, user=None):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((company_name, user, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._collect, name='fetch-batcher', daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(closing_connections(self._run_batch), batch)
+
+    def _run_batch(self, batch):
+        if len(batch) == 1:
+            self._run_single(*batch[0])
+            return
+
+        names = [name for name, _, _ in batch]
+        users = [user for _, user, _ in batch]
+        try:
+            prompt = build_company_batch_prompt(names)
+            items = extract_company_batch(generate(prompt, charge_to=users, action='fetch_batch'))
+        except Exception:
+            items = []
+
+        items = [item for item in items if isinstance(item, dict)]
+        by_query = {
+            _query_key(item['query']): item
+            for item in items
+            if isinstance(item.get('query'), str)
+        }
+        # Fall back to position only when the model dropped every query
+        # echo; a reordered reply would otherwise swap companies.
+        by_position = not any('query' in item for item in items) and len(items) == len(batch)
+        for index, (name, user, future) in enumerate(batch):
+            item = items[index] if by_position else by_query.get(_query_key(name))
+            if is_valid(item, BATCH_COMPANY_SCHEMA):
+                item = {field: item[field] for field in COMPANY_SCHEMA.fields}
+                future.set_result(item)
+            else:
+                self._run_single(name, user, future)
+
+    def _run_single(self, company_name, user, future):
+        try:
+            future.set_result(fetch_company_data(company_name, user=user))
+        except Exception as e:
+            future.set_exception(e)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_fetch_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = FetchBatcher(
+                window=settings.AI_FETCH_BATCH_WINDOW,
+                max_size=settings.AI_FETCH_BATCH_SIZE,
+            )
+        return _batcher
@@ -0,0 +1,179 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import combinations
+from django.conf import settings
+from django.db import IntegrityError
+from rivalradar.db import closing_connections
+from .models import CompanyComparison
+from .services import generate_comparison
+
+# Keys that name a side of the comparison and must be swapped together.
+ORIENTED_KEYS = {
+    'company1': 'company2',
+    'company2': 'company1',
+    'company1Has': 'company2Has',
+    'company2Has': 'company1Has',
+}
+
+
+def company_error(company, label='company'):
+    """
+    Return why company cannot be compared, or None if it can. Checked before
+    any model call so bad input is rejected without spending one.
+    """
+    if not isinstance(company, dict):
+        return f'{label} must be an object'
+    if not isinstance(company.get('name'), str) or not company['name'].strip():
+        return f'{label} must have a name'
+    for field in ('description', 'website'):
+        if not isinstance(company.get(field) or '', str):
+            return f'{label} {field} must be a string'
+    if not isinstance(company.get('features') or [], list):
+        return f'{label} features must be a list'
+    return None
+
+
+def company_hash(company):
+    """
+    Return a stable hash of the company fields used in a comparison prompt.
+    """
+    payload = json.dumps(
+        [
+            company.get('name') or '',
+            company.get('description') or '',
+            company.get('website') or '',
+            list(company.get('features') or []),
+        ],
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def pair_hash(hash1, hash2):
+    """
+    Order-independent hash of two company hashes.
+    """
+    first, second = sorted((hash1, hash2))
+    return hashlib.sha256(f'{first}:{second}'.encode('ascii')).hexdigest()
+
+
+def swap_orientation(value):
+    """
+    Return a copy of a comparison with company1 and company2 exchanged.
+    """
+    if isinstance(value, dict):
+        return {ORIENTED_KEYS.get(key, key): swap_orientation(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [swap_orientation(item) for item in value]
+    return value
+
+
+def _store(company1, company2, hash1, hash2, result):
+    """
+    Persist a comparison computed for (company1, company2) in canonical order.
+    """
+    if hash1 > hash2:
+        company1, company2, hash1, hash2 = company2, company1, hash2, hash1
+        result = swap_orientation(result)
+    try:
+        CompanyComparison.objects.create(
+            pair_hash=pair_hash(hash1, hash2),
+            first_hash=hash1,
+            second_hash=hash2,
+            first_name=(company1.get('name') or '')[:200],
+            second_name=(company2.get('name') or '')[:200],
+            result=result,
+        )
+    except IntegrityError:
+        # A concurrent request stored the same pair first.
+        pass
+
+
+def _oriented(comparison, hash1):
+    """
+    Return the stored result in the caller's orientation, where hash1 is the
+    hash of the caller's company1.
+    """
+    if comparison.first_hash == hash1:
+        return comparison.result
+    return swap_orientation(comparison.result)
+
+
+def compare_pair(company1, company2, user=None):
+    """
+    Return (comparison, cached) for two companies, computing and storing the
+    comparison only if this pair has not been compared before.
+    """
+    hash1 = company_hash(company1)
+    hash2 = company_hash(company2)
+
+    comparison = CompanyComparison.objects.filter(pair_hash=pair_hash(hash1, hash2)).first()
+    if comparison is not None:
+        return _oriented(comparison, hash1), True
+
+    result = generate_comparison(company1, company2, user=user)
+    _store(company1, company2, hash1, hash2, result)
+    return result, False
+
+
+def compare_all_pairs(companies, user=None):
+    """
+    Compare every pair of companies. Cached pairs are loaded in one query and
+    missing pairs are computed concurrently. Each comparison is stored as
+    soon as it completes, so a failure in one pair does not discard the
+    others that were already paid for.
+    """
+    hashes = [company_hash(company) for company in companies]
+    pairs = list(combinations(range(len(companies)), 2))
+    keys = {pair: pair_hash(hashes[pair[0]], hashes[pair[1]]) for pair in pairs}
+
+    cached = {
+        comparison.pair_hash: comparison
+        for comparison in CompanyComparison.objects.filter(pair_hash__in=set(keys.values()))
+    }
+
+    # Compute each missing pair once, even if the same companies repeat.
+    missing = {}
+    for pair in pairs:
+        if keys[pair] not in cached:
+            missing.setdefault(keys[pair], pair)
+
+    computed = {}
+    if missing:
+        error = None
+        with ThreadPoolExecutor(max_workers=settings.AI_COMPARE_MANY_WORKERS) as executor:
+            futures = {
+                executor.submit(closing_connections(generate_comparison), companies[i], companies[j], user): key
+                for key, (i, j) in missing.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    computed[key] = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                i, j = missing[key]
+                _store(companies[i], companies[j], hashes[i], hashes[j], computed[key])
+        if error is not None:
+            raise error
+
+    results = []
+    for i, j in pairs:
+        key = keys[i, j]
+        if key in cached:
+            comparison = _oriented(cached[key], hashes[i])
+        else:
+            computed_i, _ = missing[key]
+            comparison = computed[key]
+            if hashes[computed_i] != hashes[i]:
+                comparison = swap_orientation(comparison)
+        results.append({
+            'company1': i,
+            'company2': j,
+            'cached': key in cached,
+            'comparison': comparison,
+        })
+    return results
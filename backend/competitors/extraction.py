@@ -0,0 +1,324 @@
+"""
+Extraction of JSON values from LLM responses.
+
+Models often wrap the JSON we ask for in code fences, prepend or append
+prose, or return several objects. The extractor scans the response once,
+tracking string literals and bracket nesting, and returns the first
+balanced JSON value that matches the expected schema.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple, TypedDict
+
+# Only these characters change the scanner state, so the regex engine can
+# skip everything else in C.
+_TOKEN = re.compile(r'[\[\]{}"\\]')
+_CLOSING = {'{': '}', '[': ']'}
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+_OPENING = re.compile(r'[\[{]')
+_DECODER = json.JSONDecoder()
+
+
+class ExtractionError(ValueError):
+    pass
+
+
+class CompanyInfo(TypedDict, total=False):
+    name: str
+    description: str
+    website: str
+    features: List[str]
+    market_position: str
+
+
+class SearchResult(TypedDict, total=False):
+    name: str
+    description: str
+    website: str
+    industry: str
+    features: List[str]
+
+
+class BatchCompanyInfo(CompanyInfo, total=False):
+    query: str
+
+
+class Comparison(TypedDict, total=False):
+    marketShare: dict
+    revenue: dict
+    strengths: dict
+    weaknesses: dict
+    featureComparison: list
+    overallAnalysis: str
+
+
+class SwotAnalysis(TypedDict, total=False):
+    strengths: List[str]
+    weaknesses: List[str]
+    opportunities: List[str]
+    threats: List[str]
+    sentiment_score: float
+    summary: str
+
+
+@dataclass(frozen=True)
+class Schema:
+    """
+    A minimal structural schema: the expected JSON type, typed fields for
+    objects, required fields, and an item schema for arrays.
+    """
+    type: type
+    fields: dict = field(default_factory=dict)
+    required: Tuple[str, ...] = ()
+    items: Optional['Schema'] = None
+
+    @property
+    def opening(self):
+        return '[' if self.type is list else '{'
+
+
+COMPANY_SCHEMA = Schema(
+    dict,
+    fields={
+        'name': str,
+        'description': str,
+        'website': str,
+        'features': list,
+        'market_position': str,
+    },
+    required=('name', 'description', 'website', 'market_position'),
+)
+
+BATCH_COMPANY_SCHEMA = Schema(
+    dict,
+    fields={**COMPANY_SCHEMA.fields, 'query': str},
+    required=COMPANY_SCHEMA.required + ('features',),
+)
+
+SEARCH_RESULTS_SCHEMA = Schema(
+    list,
+    items=Schema(
+        dict,
+        fields={
+            'name': str,
+            'description': str,
+            'website': str,
+            'industry': str,
+            'features': list,
+        },
+        required=('name',),
+    ),
+)
+
+COMPARISON_SCHEMA = Schema(
+    dict,
+    fields={
+        'marketShare': dict,
+        'revenue': dict,
+        'strengths': dict,
+        'weaknesses': dict,
+        'featureComparison': list,
+        'overallAnalysis': str,
+    },
+    required=('overallAnalysis',),
+)
+
+ANALYSIS_SCHEMA = Schema(
+    dict,
+    fields={
+        'strengths': list,
+        'weaknesses': list,
+        'opportunities': list,
+        'threats': list,
+        'sentiment_score': (int, float),
+        'summary': str,
+    },
+    required=('strengths', 'weaknesses', 'opportunities', 'threats'),
+)
+
+
+def validate(value, schema, path='$'):
+    """
+    Check a parsed value against a schema, raising ExtractionError with the
+    path of the first mismatch.
+    """
+    if not isinstance(value, schema.type):
+        raise ExtractionError(f'{path}: expected {schema.type.__name__}, got {type(value).__name__}')
+    if schema.type is dict:
+        for name in schema.required:
+            if name not in value:
+                raise ExtractionError(f'{path}: missing required field "{name}"')
+        for name, expected in schema.fields.items():
+            if name in value and value[name] is not None and not isinstance(value[name], expected):
+                expected_name = ' or '.join(t.__name__ for t in expected) if isinstance(expected, tuple) else expected.__name__
+                raise ExtractionError(f'{path}.{name}: expected {expected_name}')
+    if schema.items is not None:
+        for index, item in enumerate(value):
+            validate(item, schema.items, f'{path}[{index}]')
+    return value
+
+
+def iter_json_spans(text, openings='{[', pos=0):
+    """
+    Yield (start, end) for each balanced top-level bracketed span in text
+    from pos onwards whose opening bracket is in openings, in a single
+    left-to-right scan.
+    """
+    stack = []
+    start = 0
+    in_string = False
+    skip_to = -1
+    for match in _TOKEN.finditer(text, pos):
+        index = match.start()
+        if index < skip_to:
+            continue
+        char = text[index]
+
+        if in_string:
+            if char == '\\':
+                skip_to = index + 2
+            elif char == '"':
+                in_string = False
+            continue
+
+        if not stack:
+            # Outside a span only an opening bracket matters; quotes and
+            # backslashes in surrounding prose are ignored.
+            if char in openings and char in _CLOSING:
+                stack.append(char)
+                start = index
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSING:
+            stack.append(char)
+        elif char == _CLOSING[stack[-1]]:
+            stack.pop()
+            if not stack:
+                yield start, index + 1
+        elif char in '}]':
+            # Mismatched bracket: this span can never be valid JSON.
+            stack.clear()
+
+
+def _repair(candidate, error):
+    """
+    Decode a candidate that already failed to decode with error, after
+    removing trailing commas, the most common near-miss from LLMs.
+    """
+    repaired = _TRAILING_COMMA.sub(r'\1', candidate)
+    if repaired == candidate:
+        raise error
+    return json.loads(repaired)
+
+
+def _next_value(text, pos):
+    """
+    Return (value, end) for the first JSON value starting at a bracket at
+    or after pos, or None if there is none. Each candidate is decoded once
+    in C; the scanner only runs to find the extent of a candidate that
+    fails to decode, so that near-misses such as trailing commas can be
+    repaired. A candidate with no balanced extent, such as a stray bracket
+    in prose, is skipped. Raises json.JSONDecodeError, with the end of the
+    span as error.end, for a span that cannot be repaired.
+    """
+    while True:
+        match = _OPENING.search(text, pos)
+        if match is None:
+            return None
+        start = match.start()
+        pos = start + 1
+        try:
+            return _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError as e:
+            if e.pos >= len(text) or e.msg.startswith('Unterminated string'):
+                # The value runs to the end of the text, so it has no
+                # balanced span; a later bracket may still start one.
+                continue
+            error = e
+        span = next(iter_json_spans(text, pos=start), None)
+        if span is not None:
+            break
+
+    span_start, end = span
+    try:
+        if span_start == start:
+            # The decoder already failed on this span; only a repair can help.
+            return _repair(text[start:end], error), end
+        candidate = text[span_start:end]
+        try:
+            return json.loads(candidate), end
+        except json.JSONDecodeError as e:
+            return _repair(candidate, e), end
+    except json.JSONDecodeError as e:
+        e.end = end
+        raise
+
+
+def extract_json(text, schema):
+    """
+    Return the first JSON value in text that matches schema.
+
+    When an array is expected but the model returned a sequence of bare
+    objects instead, the valid objects are collected into a list.
+    """
+    if not isinstance(text, str):
+        raise ExtractionError('AI response is not text')
+
+    last_error = None
+    objects = []
+    pos = 0
+    while True:
+        try:
+            found = _next_value(text, pos)
+        except json.JSONDecodeError as e:
+            last_error = e
+            pos = e.end
+            continue
+        if found is None:
+            break
+        value, pos = found
+        try:
+            return validate(value, schema)
+        except ExtractionError as e:
+            last_error = e
+        if schema.type is list and isinstance(value, dict):
+            objects.append(value)
+
+    if objects:
+        return validate(objects, schema)
+    if last_error is not None:
+        raise ExtractionError(f'Failed to parse AI response as JSON: {last_error}')
+    raise ExtractionError('Failed to parse AI response as JSON')
+
+
+def extract_company(text) -> CompanyInfo:
+    return extract_json(text, COMPANY_SCHEMA)
+
+
+def extract_company_batch(text) -> List[BatchCompanyInfo]:
+    # Items are validated individually by the batcher so one malformed
+    # entry does not discard the rest of the reply.
+    return extract_json(text, Schema(list))
+
+
+def extract_search_results(text) -> List[SearchResult]:
+    return extract_json(text, SEARCH_RESULTS_SCHEMA)
+
+
+def extract_comparison(text) -> Comparison:
+    return extract_json(text, COMPARISON_SCHEMA)
+
+
+def extract_analysis(text) -> SwotAnalysis:
+    return extract_json(text, ANALYSIS_SCHEMA)
+
+
+def is_valid(value: Any, schema: Schema) -> bool:
+    try:
+        validate(value, schema)
+        return True
+    except ExtractionError:
+        return False
@@ -0,0 +1,79 @@
+import zlib
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+# Every stored value starts with a one-byte codec marker so the codec can be
+# changed without rewriting existing rows.
+RAW = b'r'
+ZLIB = b'z'
+ZSTD = b's'
+
+# Below this size compression costs more than it saves.
+MIN_COMPRESS_SIZE = 256
+
+
+def compress(text):
+    data = text.encode('utf-8')
+    if len(data) < MIN_COMPRESS_SIZE:
+        return RAW + data
+    if settings.AI_INSIGHTS_CODEC == 'zstd' and zstandard is not None:
+        return ZSTD + zstandard.ZstdCompressor(level=9).compress(data)
+    return ZLIB + zlib.compress(data, 9)
+
+
+def decompress(value):
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, str):
+        # Rows written before the column was compressed.
+        return value
+    codec, data = value[:1], value[1:]
+    if codec == ZLIB:
+        data = zlib.decompress(data)
+    elif codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed values')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec != RAW:
+        raise ValueError(f'Unknown compression codec {codec!r}')
+    return data.decode('utf-8')
+
+
+class CompressedTextField(models.TextField):
+    """
+    A TextField stored compressed in a binary column.
+
+    Python code, forms and serializers see a plain string; only the
+    database sees compressed bytes. Text lookups such as icontains do not
+    work on the stored value.
+    """
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decompress(value)
+        return super().to_python(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return compress(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is not None:
+            return connection.Database.Binary(value)
+        return value
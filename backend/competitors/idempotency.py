@@ -0,0 +1,127 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    payload = json.dumps(
+        [request.method, request.path, request.data],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _claim(user, key_hash, fingerprint):
+    """
+    Claim the key for this request. Return None if it was claimed, or the
+    existing row if another request holds it or has already finished.
+    """
+    now = timezone.now()
+    lock_expires = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    while True:
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=user, key_hash=key_hash, fingerprint=fingerprint, expires_at=lock_expires,
+                )
+            # Keys are only reused by the same user, so drop that user's
+            # expired keys instead of sweeping the whole table.
+            IdempotencyKey.objects.filter(user=user, expires_at__lte=now).delete()
+            return None
+        except IntegrityError:
+            pass
+
+        existing = IdempotencyKey.objects.filter(user=user, key_hash=key_hash).first()
+        if existing is None:
+            # Deleted since the insert failed; try again.
+            continue
+        if existing.expires_at > now:
+            return existing
+
+        # Expired: take it over unless another request got there first.
+        claimed = IdempotencyKey.objects.filter(pk=existing.pk, expires_at=existing.expires_at).update(
+            fingerprint=fingerprint, state='in_progress', status_code=None, data=None,
+            headers={}, expires_at=lock_expires,
+        )
+        if claimed:
+            return None
+
+
+def idempotent(view_func):
+    """
+    Make a viewset action safe to retry with an Idempotency-Key header.
+
+    The first request with a key claims it in the database, then stores
+    the response. Retries with the same key and payload replay the stored
+    response without running the action again, on any worker. Server
+    errors are not stored so the client can retry them.
+    """
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_func(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        key_hash = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        fingerprint = _fingerprint(request)
+
+        stored = _claim(request.user, key_hash, fingerprint)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return Response(
+                    {'error': f'{HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if stored.state == 'in_progress':
+                response = Response(
+                    {'error': 'A request with this Idempotency-Key is still in progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response['Retry-After'] = '1'
+                return response
+
+            response = Response(stored.data, status=stored.status_code)
+            for name, value in stored.headers.items():
+                response[name] = value
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        claimed = IdempotencyKey.objects.filter(user=request.user, key_hash=key_hash)
+        try:
+            response = view_func(self, request, *args, **kwargs)
+        except Exception:
+            claimed.delete()
+            raise
+
+        if response.status_code >= 500:
+            claimed.delete()
+        else:
+            claimed.update(
+                state='done',
+                status_code=response.status_code,
+                data=response.data,
+                headers={
+                    name: value for name, value in response.items()
+                    if name.lower() != 'content-type'
+                },
+                expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return response
+
+    return wrapper
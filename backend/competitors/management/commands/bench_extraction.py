@@ -0,0 +1,115 @@
+import json
+import random
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from competitors.extraction import (
+    COMPARISON_SCHEMA,
+    COMPANY_SCHEMA,
+    SEARCH_RESULTS_SCHEMA,
+    ExtractionError,
+    extract_json,
+)
+
+CORPUS_PATH = Path(__file__).resolve().parents[2] / 'benchmarks' / 'llm_responses.json'
+
+SCHEMAS = {
+    'company': COMPANY_SCHEMA,
+    'comparison': COMPARISON_SCHEMA,
+    'search': SEARCH_RESULTS_SCHEMA,
+}
+
+PROSE = [
+    'Sure, here you go.',
+    'Note: fields in {braces} are estimates.',
+    'Sources: [1] company website, [2] press releases.',
+    'Let me know if you want more detail!',
+]
+
+
+def legacy_extract(text, schema):
+    """
+    The json.loads then find/rfind fallback previously inlined in each view.
+    """
+    opening = schema.opening
+    closing = '}' if opening == '{' else ']'
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start_idx = text.find(opening)
+        end_idx = text.rfind(closing) + 1
+        if start_idx >= 0 and end_idx > start_idx:
+            return json.loads(text[start_idx:end_idx])
+        raise ValueError('Failed to parse AI response as JSON')
+
+
+def mutate(text, rng):
+    """
+    Apply one random real-world corruption to a response.
+    """
+    choice = rng.randrange(6)
+    if choice == 0:
+        return f'```json\n{text}\n```'
+    if choice == 1:
+        return f'{rng.choice(PROSE)}\n{text}'
+    if choice == 2:
+        return f'{text}\n\n{rng.choice(PROSE)}'
+    if choice == 3:
+        return f'{rng.choice(PROSE)}\n```\n{text}\n```\n{rng.choice(PROSE)}'
+    if choice == 4:
+        return text[:rng.randrange(1, max(len(text), 2))]
+    return text.replace('\n}', ',\n}', 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark JSON extraction from LLM responses against the previous '
+        'find/rfind fallback, using the bundled corpus plus fuzzed variants.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fuzz', type=int, default=200, help='Fuzzed variants per corpus entry.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timing iterations per response.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        corpus = json.loads(CORPUS_PATH.read_text())
+
+        cases = []
+        for entry in corpus:
+            schema = SCHEMAS[entry['kind']]
+            cases.append((entry['text'], schema))
+            for _ in range(options['fuzz']):
+                cases.append((mutate(entry['text'], rng), schema))
+
+        for entry in corpus:
+            parsed = self.succeeds(extract_json, entry['text'], SCHEMAS[entry['kind']])
+            ok = parsed == entry['parses']
+            self.stdout.write(f"{'ok  ' if ok else 'FAIL'} {entry['kind']:<10} {entry['note']}")
+
+        self.stdout.write('')
+        for label, func in (('legacy', legacy_extract), ('extractor', extract_json)):
+            succeeded = sum(self.succeeds(func, text, schema) for text, schema in cases)
+            elapsed = self.time(func, cases, options['iterations'])
+            self.stdout.write(
+                f'{label:<10} parsed {succeeded}/{len(cases)} responses, '
+                f'{elapsed / (len(cases) * options["iterations"]) * 1e6:.1f} us/response'
+            )
+
+    def succeeds(self, func, text, schema):
+        try:
+            value = func(text, schema)
+        except (ValueError, ExtractionError):
+            return False
+        return isinstance(value, schema.type)
+
+    def time(self, func, cases, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for text, schema in cases:
+                try:
+                    func(text, schema)
+                except ValueError:
+                    pass
+        return time.perf_counter() - started
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from competitors.prompts import build_analysis_prompt, build_comparison_prompt, count_tokens
+
+SENTENCES = [
+    'The platform helps mid-market teams track competitor pricing in real time.',
+    'It was founded in 2014 and is headquartered in Berlin.',
+    'Customers include retailers, logistics providers and several public agencies.',
+    'The company raised a Series C round led by a growth equity fund.',
+    'Its analytics suite integrates with most popular CRM and ERP systems.',
+    'Recent releases focused on forecasting, alerting and mobile dashboards.',
+    'Support is available around the clock through chat, email and phone.',
+    'The product roadmap emphasizes automation and AI-assisted reporting.',
+    'Pricing is seat-based with volume discounts for enterprise contracts.',
+    'Independent reviewers praise onboarding but criticize export options.',
+]
+
+FEATURES = [
+    'Price tracking', 'Alerts', 'Dashboards', 'Forecasting', 'CRM integration',
+    'ERP integration', 'Mobile app', 'SSO', 'Audit log', 'API access',
+    'Custom reports', 'Data export', 'Role-based access', 'Webhooks', 'Slack integration',
+]
+
+
+def make_company(rng, index, sentences):
+    """
+    Build a company with a long, partly repetitive description and a feature
+    list containing case and spacing variants of the same features.
+    """
+    description = ' '.join(rng.choice(SENTENCES) for _ in range(sentences))
+    features = []
+    for _ in range(rng.randrange(10, 60)):
+        feature = rng.choice(FEATURES)
+        features.append(rng.choice([feature, feature.lower(), f' {feature} ', feature.upper()]))
+    return {
+        'name': f'Company {index}',
+        'description': description,
+        'website': f'https://company{index}.example.com',
+        'features': features,
+        'market_position': ' '.join(rng.choice(SENTENCES) for _ in range(rng.randrange(1, 6))),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark prompt compaction on a synthetic corpus of companies with '
+        'large descriptions: prompt tokens, estimated cost and, with --live, '
+        'Gemini latency for full and compacted prompts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=200, help='Companies in the corpus.')
+        parser.add_argument('--sentences', type=int, default=150, help='Maximum sentences per description.')
+        parser.add_argument(
+            '--price', type=float, default=0.5,
+            help='USD per million prompt tokens, for the cost estimate (default: 0.5).',
+        )
+        parser.add_argument(
+            '--live', type=int, default=0,
+            help='Send this many prompts of each kind to Gemini to measure latency.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        companies = [
+            make_company(rng, index, rng.randrange(1, options['sentences'] + 1))
+            for index in range(options['companies'])
+        ]
+        pairs = list(zip(companies[::2], companies[1::2]))
+
+        builders = {
+            'analyze': lambda action: [build_analysis_prompt(company, action) for company in companies],
+            'compare': lambda action: [build_comparison_prompt(a, b, action) for a, b in pairs],
+        }
+        for action, build in builders.items():
+            self.stdout.write(f'{action}:')
+            for label, budget_action in (('full', None), ('compacted', action)):
+                started = time.perf_counter()
+                prompts = build(budget_action)
+                elapsed = time.perf_counter() - started
+                tokens = [count_tokens(prompt) for prompt in prompts]
+                cost = sum(tokens) / 1e6 * options['price']
+                self.stdout.write(
+                    f'  {label:<10} mean {statistics.mean(tokens):8.0f} tokens, '
+                    f'max {max(tokens):6d}, '
+                    f'${cost / len(prompts) * 1000:.4f} per 1000 calls, '
+                    f'built in {elapsed / len(prompts) * 1e6:.0f} us/prompt'
+                )
+                if options['live']:
+                    self.stdout.write(f'  {label:<10} {self.live_latency(prompts[:options["live"]])}')
+
+    def live_latency(self, prompts):
+        from competitors.ai import model
+
+        latencies = []
+        for prompt in prompts:
+            started = time.perf_counter()
+            model.generate_content(prompt)
+            latencies.append(time.perf_counter() - started)
+        return f'mean Gemini latency {statistics.mean(latencies) * 1000:.0f} ms over {len(latencies)} calls'
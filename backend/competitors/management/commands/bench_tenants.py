@@ -0,0 +1,142 @@
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from analysis.models import Analysis
+from competitors.models import Competitor, CompetitorAnalysis
+
+User = get_user_model()
+
+PAGE_SIZE = 10
+
+
+def scoped_queries(user):
+    """
+    The queries behind one user's competitor list, market overview and
+    analysis list.
+    """
+    competitors = Competitor.objects.filter(created_by=user)
+    return [
+        lambda: competitors.count(),
+        lambda: list(competitors.order_by('-updated_at')[:PAGE_SIZE]),
+        lambda: list(competitors.values_list('market_position', flat=True).distinct()),
+        lambda: list(
+            CompetitorAnalysis.objects.filter(competitor__in=competitors)
+            .order_by('-analysis_date')[:5]
+            .values('competitor__name', 'analysis_date', 'market_share', 'sentiment_score')
+        ),
+        lambda: list(Analysis.objects.filter(created_by=user).order_by('-created_at')[:PAGE_SIZE]),
+    ]
+
+
+def unscoped_queries():
+    """
+    The same queries over every tenant's rows, as the viewsets ran them
+    before they were scoped to the requesting user.
+    """
+    competitors = Competitor.objects.all()
+    return [
+        lambda: competitors.count(),
+        lambda: list(competitors.order_by('-updated_at')[:PAGE_SIZE]),
+        lambda: list(competitors.values_list('market_position', flat=True).distinct()),
+        lambda: list(
+            CompetitorAnalysis.objects.filter(competitor__in=competitors)
+            .order_by('-analysis_date')[:5]
+            .values('competitor__name', 'analysis_date', 'market_share', 'sentiment_score')
+        ),
+        lambda: list(Analysis.objects.order_by('-created_at')[:PAGE_SIZE]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark per-user list and overview queries as the number of tenants '
+        'grows. Synthetic tenants are created inside a transaction that is '
+        'rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenants', type=int, nargs='+', default=[10, 100, 1000],
+            help='Tenant counts to measure at (default: 10 100 1000).',
+        )
+        parser.add_argument('--competitors', type=int, default=20, help='Competitors per tenant.')
+        parser.add_argument('--analyses', type=int, default=5, help='Analyses per competitor.')
+        parser.add_argument('--repeat', type=int, default=30, help='Timing runs per measurement.')
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Print the query plan of the scoped competitor list query.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'tenants':>8} {'rows':>9} {'scoped ms':>10} {'unscoped ms':>12}")
+        with transaction.atomic():
+            created = 0
+            for tenants in sorted(options['tenants']):
+                self.create_tenants(created, tenants, options['competitors'], options['analyses'])
+                created = tenants
+                self.analyze_tables()
+
+                user = User.objects.filter(username__startswith='bench-tenant-').order_by('pk').last()
+                scoped = self.time(scoped_queries(user), options['repeat'])
+                unscoped = self.time(unscoped_queries(), options['repeat'])
+                rows = Competitor.objects.count() + CompetitorAnalysis.objects.count()
+                self.stdout.write(f'{tenants:>8} {rows:>9} {scoped:>10.2f} {unscoped:>12.2f}')
+
+            if options['explain']:
+                self.stdout.write('')
+                self.stdout.write(
+                    Competitor.objects.filter(created_by=user).order_by('-updated_at')[:PAGE_SIZE].explain()
+                )
+            transaction.set_rollback(True)
+
+    def create_tenants(self, start, stop, competitors_per_tenant, analyses_per_competitor):
+        users = User.objects.bulk_create([
+            User(username=f'bench-tenant-{index}', email=f'bench-tenant-{index}@example.com')
+            for index in range(start, stop)
+        ])
+        competitors = Competitor.objects.bulk_create([
+            Competitor(
+                name=f'Competitor {index}',
+                description='Benchmark competitor',
+                website='https://example.com',
+                market_position=f'Position {index % 5}',
+                created_by=user,
+            )
+            for user in users
+            for index in range(competitors_per_tenant)
+        ], batch_size=1000)
+        CompetitorAnalysis.objects.bulk_create([
+            CompetitorAnalysis(
+                competitor=competitor,
+                created_by_id=competitor.created_by_id,
+                ai_insights='',
+                sentiment_score=0.5,
+            )
+            for competitor in competitors
+            for _ in range(analyses_per_competitor)
+        ], batch_size=1000)
+        Analysis.objects.bulk_create([
+            Analysis(title='Benchmark analysis', description='', created_by=user)
+            for user in users
+            for _ in range(competitors_per_tenant // 4 or 1)
+        ], batch_size=1000)
+
+    def analyze_tables(self):
+        # Refresh planner statistics so the new rows are costed correctly.
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def time(self, queries, repeat):
+        """
+        Return the median milliseconds to run every query once.
+        """
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for query in queries:
+                query()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
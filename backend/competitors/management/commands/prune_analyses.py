@@ -0,0 +1,125 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from competitors.models import CompetitorAnalysis, CompetitorAnalysisSummary
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll analyses older than the retention window into per-competitor '
+        'summaries and prune their full ai_insights text. The latest analysis '
+        'of each competitor is always kept intact.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days', type=int, default=30,
+            help='Keep the full text of analyses newer than this many days (default: 30).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of analyses pruned per transaction (default: 500).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many analyses would be pruned.',
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Reclaim freed space with VACUUM after pruning.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        latest = CompetitorAnalysis.objects.filter(
+            competitor=OuterRef('competitor')
+        ).order_by('-analysis_date').values('pk')[:1]
+        candidates = CompetitorAnalysis.objects.filter(
+            analysis_date__lt=cutoff,
+            insights_pruned=False,
+        ).exclude(pk=Subquery(latest)).order_by('pk')
+
+        if options['dry_run']:
+            self.stdout.write(f'Would prune {candidates.count()} analyses older than {cutoff:%Y-%m-%d}.')
+            return
+
+        size_before = self.database_size()
+        pruned = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                candidates.filter(pk__gt=last_pk).values(
+                    'pk', 'competitor_id', 'analysis_date', 'sentiment_score', 'market_share'
+                )[:options['batch_size']]
+            )
+            if not batch:
+                break
+            self.prune_batch(batch)
+            pruned += len(batch)
+            last_pk = batch[-1]['pk']
+            self.stdout.write(f'Pruned {pruned} analyses...')
+
+        if options['vacuum']:
+            self.vacuum()
+        size_after = self.database_size()
+
+        message = f'Pruned {pruned} analyses older than {cutoff:%Y-%m-%d}.'
+        if size_before is not None and size_after is not None:
+            message += f' Database size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB.'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    @transaction.atomic
+    def prune_batch(self, batch):
+        by_competitor = defaultdict(list)
+        for row in batch:
+            by_competitor[row['competitor_id']].append(row)
+
+        summaries = {
+            summary.competitor_id: summary
+            for summary in CompetitorAnalysisSummary.objects.select_for_update().filter(
+                competitor_id__in=by_competitor
+            )
+        }
+        for competitor_id, rows in by_competitor.items():
+            summary = summaries.get(competitor_id)
+            if summary is None:
+                summary = CompetitorAnalysisSummary(competitor_id=competitor_id)
+            dates = [row['analysis_date'] for row in rows]
+            summary.series = sorted(
+                summary.series + [
+                    [row['analysis_date'].isoformat(), row['sentiment_score'], row['market_share']]
+                    for row in rows
+                ],
+                key=lambda point: point[0],
+            )
+            summary.analysis_count += len(rows)
+            summary.first_analysis_date = min(filter(None, [summary.first_analysis_date, *dates]))
+            summary.last_analysis_date = max(filter(None, [summary.last_analysis_date, *dates]))
+            summary.save()
+
+        CompetitorAnalysis.objects.filter(pk__in=[row['pk'] for row in batch]).update(
+            ai_insights='',
+            insights_pruned=True,
+        )
+
+    def database_size(self):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA page_count')
+                page_count = cursor.fetchone()[0]
+                cursor.execute('PRAGMA page_size')
+                return page_count * cursor.fetchone()[0]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_database_size(current_database())')
+                return cursor.fetchone()[0]
+        return None
+
+    def vacuum(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
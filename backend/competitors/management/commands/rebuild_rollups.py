@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from competitors.models import AnalysisRollup, CompetitorAnalysis
+from competitors.timeseries import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the day/week/month analysis rollups from raw analyses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'competitor_ids', nargs='*', type=int,
+            help='Only rebuild rollups for these competitors.',
+        )
+
+    def handle(self, *args, **options):
+        rebuild_rollups(CompetitorAnalysis, AnalysisRollup, options['competitor_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {AnalysisRollup.objects.count()} rollups.'))
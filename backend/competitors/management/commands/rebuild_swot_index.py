@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from competitors.models import CompetitorAnalysis, SwotTerm
+from competitors.swot import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SWOT term index from the latest analysis of each competitor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'competitor_ids', nargs='*', type=int,
+            help='Only rebuild the index for these competitors.',
+        )
+
+    def handle(self, *args, **options):
+        rebuild_index(CompetitorAnalysis, SwotTerm, options['competitor_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {SwotTerm.objects.count()} SWOT terms.'))
@@ -0,0 +1,144 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+from competitors.models import Competitor, CompetitorAnalysis
+from competitors.services import analysis_input_hash, run_analysis
+from rivalradar.db import closing_connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-analyze stale competitors in priority order, skipping those whose '
+        'analysis inputs have not changed since their latest analysis.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=float, default=24,
+            help='Hours after which an analysis is considered stale (default: 24).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5,
+            help='Number of analyses dispatched concurrently per batch (default: 5).',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=30,
+            help='Maximum analyses started per minute (default: 30).',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of analyses to run per pass.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be analyzed.',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, starting a new pass every --interval seconds.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=600,
+            help='Seconds between passes when running with --loop (default: 600).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_pass(options)
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def build_queue(self, max_age):
+        """
+        Return a heap of (priority, id, competitor) for every stale competitor.
+        Never-analyzed competitors come first, then competitors ordered by
+        hours of staleness weighted by how many analyses reference them.
+        """
+        now = timezone.now()
+        latest_hash = CompetitorAnalysis.objects.filter(
+            competitor=OuterRef('pk')
+        ).order_by('-analysis_date').values('input_hash')[:1]
+
+        competitors = Competitor.objects.filter(
+            Q(last_analyzed__isnull=True) | Q(last_analyzed__lt=now - max_age)
+        ).select_related('created_by').annotate(
+            importance=Count('competitor_analyses', distinct=True),
+            latest_hash=Subquery(latest_hash),
+        )
+
+        queue = []
+        for competitor in competitors:
+            if competitor.last_analyzed is None:
+                staleness = float('inf')
+            else:
+                staleness = (now - competitor.last_analyzed).total_seconds() / 3600
+            priority = staleness * (1 + competitor.importance)
+            heapq.heappush(queue, (-priority, competitor.pk, competitor))
+        return queue
+
+    @closing_connections
+    def analyze(self, competitor):
+        try:
+            run_analysis(competitor, competitor.created_by)
+            return competitor, None
+        except Exception as e:
+            return competitor, e
+
+    def run_pass(self, options):
+        queue = self.build_queue(timedelta(hours=options['max_age']))
+        batch_size = max(options['batch_size'], 1)
+        min_batch_seconds = batch_size * 60 / options['rate'] if options['rate'] > 0 else 0
+        limit = options['limit']
+
+        skipped = analyzed = failed = 0
+        batch = []
+        while queue and (limit is None or analyzed + failed + len(batch) < limit):
+            _, _, competitor = heapq.heappop(queue)
+            if competitor.latest_hash == analysis_input_hash(competitor):
+                skipped += 1
+                continue
+            batch.append(competitor)
+            if len(batch) == batch_size or not queue:
+                done, errors = self.dispatch(batch, options['dry_run'], min_batch_seconds)
+                analyzed += done
+                failed += errors
+                batch = []
+        if batch:
+            done, errors = self.dispatch(batch, options['dry_run'], 0)
+            analyzed += done
+            failed += errors
+
+        verb = 'Would analyze' if options['dry_run'] else 'Analyzed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {analyzed}, skipped {skipped} unchanged, {failed} failed.'
+        ))
+
+    def dispatch(self, batch, dry_run, min_seconds):
+        if dry_run:
+            for competitor in batch:
+                self.stdout.write(f'Would analyze {competitor.name} (id={competitor.pk})')
+            return len(batch), 0
+
+        started = time.monotonic()
+        done = errors = 0
+        with ThreadPoolExecutor(max_workers=len(batch)) as executor:
+            for competitor, error in executor.map(self.analyze, batch):
+                if error is None:
+                    done += 1
+                    self.stdout.write(f'Analyzed {competitor.name} (id={competitor.pk})')
+                else:
+                    errors += 1
+                    self.stderr.write(f'Failed to analyze {competitor.name} (id={competitor.pk}): {error}')
+
+        # Pace batches so the upstream rate limit is respected.
+        elapsed = time.monotonic() - started
+        if elapsed < min_seconds:
+            time.sleep(min_seconds - elapsed)
+        return done, errors
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitors', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competitoranalysis',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
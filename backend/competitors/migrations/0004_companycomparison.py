@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitors', '0003_competitoranalysis_input_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyComparison',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_hash', models.CharField(max_length=64, unique=True)),
+                ('first_hash', models.CharField(max_length=64)),
+                ('second_hash', models.CharField(max_length=64)),
+                ('first_name', models.CharField(blank=True, max_length=200)),
+                ('second_name', models.CharField(blank=True, max_length=200)),
+                ('result', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+import django.db.models.deletion
+from django.db import migrations, models
+import competitors.fields
+
+
+def copy_insights(apps, schema_editor):
+    CompetitorAnalysis = apps.get_model('competitors', 'CompetitorAnalysis')
+    analyses = CompetitorAnalysis.objects.using(schema_editor.connection.alias)
+    batch = []
+    for analysis in analyses.only('id', 'ai_insights_text').iterator(chunk_size=500):
+        analysis.ai_insights = analysis.ai_insights_text
+        batch.append(analysis)
+        if len(batch) == 500:
+            analyses.bulk_update(batch, ['ai_insights'])
+            batch = []
+    if batch:
+        analyses.bulk_update(batch, ['ai_insights'])
+
+
+def restore_insights(apps, schema_editor):
+    CompetitorAnalysis = apps.get_model('competitors', 'CompetitorAnalysis')
+    analyses = CompetitorAnalysis.objects.using(schema_editor.connection.alias)
+    batch = []
+    for analysis in analyses.only('id', 'ai_insights').iterator(chunk_size=500):
+        analysis.ai_insights_text = analysis.ai_insights
+        batch.append(analysis)
+        if len(batch) == 500:
+            analyses.bulk_update(batch, ['ai_insights_text'])
+            batch = []
+    if batch:
+        analyses.bulk_update(batch, ['ai_insights_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitors', '0004_companycomparison'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='competitoranalysis',
+            old_name='ai_insights',
+            new_name='ai_insights_text',
+        ),
+        migrations.AddField(
+            model_name='competitoranalysis',
+            name='ai_insights',
+            field=competitors.fields.CompressedTextField(default=''),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_insights, restore_insights),
+        # A default lets the reverse of RemoveField re-add the column before
+        # restore_insights fills it.
+        migrations.AlterField(
+            model_name='competitoranalysis',
+            name='ai_insights_text',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='competitoranalysis',
+            name='ai_insights_text',
+        ),
+        migrations.AddField(
+            model_name='competitoranalysis',
+            name='insights_pruned',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='CompetitorAnalysisSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analysis_count', models.PositiveIntegerField(default=0)),
+                ('first_analysis_date', models.DateTimeField(blank=True, null=True)),
+                ('last_analysis_date', models.DateTimeField(blank=True, null=True)),
+                ('series', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('competitor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_summary', to='competitors.competitor')),
+            ],
+            options={
+                'verbose_name_plural': 'Competitor analysis summaries',
+            },
+        ),
+    ]
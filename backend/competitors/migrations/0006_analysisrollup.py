@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    from competitors.timeseries import rebuild_rollups
+
+    rebuild_rollups(
+        apps.get_model('competitors', 'CompetitorAnalysis'),
+        apps.get_model('competitors', 'AnalysisRollup'),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitors', '0005_compress_ai_insights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('analysis_count', models.PositiveIntegerField(default=0)),
+                ('sentiment_sum', models.FloatField(default=0)),
+                ('sentiment_count', models.PositiveIntegerField(default=0)),
+                ('market_share_sum', models.FloatField(default=0)),
+                ('market_share_count', models.PositiveIntegerField(default=0)),
+                ('competitor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='competitors.competitor')),
+            ],
+            options={
+                'ordering': ['period_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='analysisrollup',
+            constraint=models.UniqueConstraint(fields=('competitor', 'period', 'period_start'), name='unique_analysis_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
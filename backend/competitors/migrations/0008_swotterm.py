@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_index(apps, schema_editor):
+    from competitors.swot import rebuild_index
+
+    rebuild_index(
+        apps.get_model('competitors', 'CompetitorAnalysis'),
+        apps.get_model('competitors', 'SwotTerm'),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitors', '0007_aicall'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SwotTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('category', models.CharField(choices=[('strength', 'Strength'), ('weakness', 'Weakness'), ('opportunity', 'Opportunity'), ('threat', 'Threat')], max_length=11)),
+                ('analysis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='swot_terms', to='competitors.competitoranalysis')),
+                ('competitor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='swot_terms', to='competitors.competitor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'term'], name='swot_term_lookup')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='swotterm',
+            constraint=models.UniqueConstraint(fields=('competitor', 'category', 'term'), name='unique_swot_term'),
+        ),
+        migrations.RunPython(backfill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitors', '0008_swotterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='competitor',
+            index=models.Index(fields=['created_by', '-updated_at'], name='competitor_owner_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='competitoranalysis',
+            index=models.Index(fields=['competitor', '-analysis_date'], name='analysis_competitor_date'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import get_user_model
+from .fields import CompressedTextField
 
 User = get_user_model()
 
@@ -19,6 +21,9 @@ class Competitor(models.Model):
 
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['created_by', '-updated_at'], name='competitor_owner_updated'),
+        ]
 
 class CompetitorAnalysis(models.Model):
     competitor = models.ForeignKey(Competitor, on_delete=models.CASCADE, related_name='analyses')
@@ -28,12 +33,165 @@ class CompetitorAnalysis(models.Model):
     opportunities = models.JSONField(default=list)
     threats = models.JSONField(default=list)
     market_share = models.FloatField(null=True, blank=True)
-    ai_insights = models.TextField()
+    ai_insights = CompressedTextField()
+    insights_pruned = models.BooleanField(default=False)
     sentiment_score = models.FloatField(null=True, blank=True)
+    input_hash = models.CharField(max_length=64, blank=True, default='')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
 
     def __str__(self):
         return f"Analysis for {self.competitor.name} on {self.analysis_date}"
 
     class Meta:
-        ordering = ['-analysis_date'] 
\ No newline at end of file
+        ordering = ['-analysis_date']
+        indexes = [
+            models.Index(fields=['competitor', '-analysis_date'], name='analysis_competitor_date'),
+        ]
+
+class CompetitorAnalysisSummary(models.Model):
+    """
+    Compact history of analyses whose full insights text has been pruned.
+    series holds [analysis_date, sentiment_score, market_share] entries.
+    """
+    competitor = models.OneToOneField(Competitor, on_delete=models.CASCADE, related_name='analysis_summary')
+    analysis_count = models.PositiveIntegerField(default=0)
+    first_analysis_date = models.DateTimeField(null=True, blank=True)
+    last_analysis_date = models.DateTimeField(null=True, blank=True)
+    series = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Analysis summary for {self.competitor.name}"
+
+    class Meta:
+        verbose_name_plural = "Competitor analysis summaries"
+
+class AnalysisRollup(models.Model):
+    """
+    Per-period aggregates of CompetitorAnalysis metrics, kept up to date as
+    analyses are created, saved and deleted so charts never scan raw
+    analyses. Queryset update() bypasses this; run the rebuild_rollups
+    command after one.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    competitor = models.ForeignKey(Competitor, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    analysis_count = models.PositiveIntegerField(default=0)
+    sentiment_sum = models.FloatField(default=0)
+    sentiment_count = models.PositiveIntegerField(default=0)
+    market_share_sum = models.FloatField(default=0)
+    market_share_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.competitor.name} {self.period} of {self.period_start}"
+
+    class Meta:
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['competitor', 'period', 'period_start'],
+                name='unique_analysis_rollup',
+            ),
+        ]
+
+class CompanyComparison(models.Model):
+    """
+    A cached pairwise comparison. The pair is stored in canonical order
+    (first_hash <= second_hash) so (A, B) and (B, A) share one row.
+    """
+    pair_hash = models.CharField(max_length=64, unique=True)
+    first_hash = models.CharField(max_length=64)
+    second_hash = models.CharField(max_length=64)
+    first_name = models.CharField(max_length=200, blank=True)
+    second_name = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Comparison of {self.first_name} and {self.second_name}"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class SwotTerm(models.Model):
+    """
+    Posting in the inverted index over the SWOT lists of each competitor's
+    latest analysis.
+    """
+    CATEGORY_CHOICES = [
+        ('strength', 'Strength'),
+        ('weakness', 'Weakness'),
+        ('opportunity', 'Opportunity'),
+        ('threat', 'Threat'),
+    ]
+
+    term = models.CharField(max_length=64)
+    category = models.CharField(max_length=11, choices=CATEGORY_CHOICES)
+    competitor = models.ForeignKey(Competitor, on_delete=models.CASCADE, related_name='swot_terms')
+    analysis = models.ForeignKey(CompetitorAnalysis, on_delete=models.CASCADE, related_name='swot_terms')
+
+    def __str__(self):
+        return f"{self.category}: {self.term}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['competitor', 'category', 'term'], name='unique_swot_term'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'term'], name='swot_term_lookup'),
+        ]
+
+
+class AICall(models.Model):
+    """
+    Token usage and latency of a single Gemini call.
+    """
+    action = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ai_calls')
+    prompt_tokens = models.PositiveIntegerField()
+    completion_tokens = models.PositiveIntegerField()
+    latency_ms = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.action} call: {self.prompt_tokens}+{self.completion_tokens} tokens"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class IdempotencyKey(models.Model):
+    """
+    An Idempotency-Key sent with an AI POST action and, once the action has
+    finished, its response. The unique constraint lets exactly one request
+    per user and key claim the row, whichever worker process it reaches.
+    """
+    STATE_CHOICES = [
+        ('in_progress', 'In progress'),
+        ('done', 'Done'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key_hash = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=11, choices=STATE_CHOICES, default='in_progress')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Idempotency key {self.key_hash[:12]} ({self.state})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key_hash'], name='unique_idempotency_key'),
+        ]
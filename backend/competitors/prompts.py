@@ -0,0 +1,331 @@
+"""
+Prompt building for Gemini calls.
+
+Company fields are embedded in prompts verbatim, so a long description or
+feature list makes every call slower and more expensive. Prompts for
+actions with a budget in AI_PROMPT_TOKEN_BUDGETS are compacted to fit it:
+whitespace is normalized, repeated sentences and features are dropped, and
+the remaining budget is split between the free-text fields, which are cut
+to their leading sentences. Compaction is deterministic, so the same
+company always produces the same prompt.
+"""
+import re
+from django.conf import settings
+
+_WORD = re.compile(r'\w+|[^\w\s]')
+_SPACE = re.compile(r'\s+')
+_SENTENCE = re.compile(r'(?<=[.!?])\s+')
+_FEATURE_KEY = re.compile(r'[\W_]+')
+
+ELLIPSIS = '…'
+
+# Share of the spare budget given to each compactable field.
+FIELD_WEIGHTS = {
+    'description': 3,
+    'features': 2,
+    'market_position': 1,
+}
+
+
+def count_tokens(text):
+    """
+    Approximate the Gemini token count of text without a network call:
+    one token per punctuation mark and per four characters of each word.
+    """
+    return sum(-(-len(piece) // 4) for piece in _WORD.findall(text))
+
+
+def normalize(text):
+    return _SPACE.sub(' ', str(text or '')).strip()
+
+
+def dedupe(items):
+    """
+    Drop repeated strings, ignoring case, spacing and punctuation, and keep
+    the first spelling of each in order.
+    """
+    seen = set()
+    unique = []
+    for item in items:
+        text = normalize(item)
+        key = _FEATURE_KEY.sub(' ', text.lower()).strip()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(text)
+    return unique
+
+
+def truncate_words(text, budget):
+    """
+    Cut text at a word boundary so that it fits budget tokens.
+    """
+    words = text.split(' ')
+    kept = []
+    used = count_tokens(ELLIPSIS)
+    for word in words:
+        cost = count_tokens(word)
+        if used + cost > budget:
+            break
+        kept.append(word)
+        used += cost
+    return ' '.join(kept) + ELLIPSIS if kept else ''
+
+
+def summarize(text, budget):
+    """
+    Shorten text to at most budget tokens by keeping its leading distinct
+    sentences. A first sentence that is too long on its own is truncated.
+    """
+    text = normalize(text)
+    if count_tokens(text) <= budget:
+        return text
+
+    kept = []
+    used = 0
+    for sentence in dedupe(_SENTENCE.split(text)):
+        cost = count_tokens(sentence)
+        if used + cost > budget:
+            if not kept:
+                return truncate_words(sentence, budget)
+            break
+        kept.append(sentence)
+        used += cost
+    return ' '.join(kept)
+
+
+def join_features(features, budget=None):
+    """
+    Join distinct features into a comma-separated list that fits budget
+    tokens, noting how many were left out.
+    """
+    features = dedupe(features)
+    joined = ', '.join(features)
+    if budget is None or count_tokens(joined) <= budget:
+        return joined
+
+    kept = []
+    used = 0
+    for index, feature in enumerate(features):
+        remainder = f'(+{len(features) - index - 1} more)'
+        cost = count_tokens(feature) + 1
+        if used + cost + count_tokens(remainder) > budget:
+            break
+        kept.append(feature)
+        used += cost
+    return ', '.join(kept + [f'(+{len(features) - len(kept)} more)'])
+
+
+def allocate(needs, weights, budget):
+    """
+    Split budget between fields in proportion to weights. Fields that need
+    less than their share get exactly what they need and the rest is
+    redistributed among the others.
+    """
+    shares = {}
+    remaining = dict(needs)
+    budget = max(budget, 0)
+    while remaining:
+        total_weight = sum(weights[key] for key in remaining)
+        fair = {key: budget * weights[key] / total_weight for key in remaining}
+        satisfied = sorted(key for key in remaining if remaining[key] <= fair[key])
+        if not satisfied:
+            shares.update({key: int(fair[key]) for key in remaining})
+            break
+        for key in satisfied:
+            shares[key] = remaining.pop(key)
+            budget -= shares[key]
+    return shares
+
+
+def company_fields(company):
+    """
+    Return the prompt fields of a Competitor or a company dict.
+    """
+    if isinstance(company, dict):
+        get = company.get
+    else:
+        get = lambda name, default='': getattr(company, name, default)  # noqa: E731
+    return {
+        'name': normalize(get('name', '')),
+        'website': normalize(get('website', '')),
+        'description': normalize(get('description', '')),
+        'features': [str(feature) for feature in (get('features', []) or [])],
+        'market_position': normalize(get('market_position', '')),
+    }
+
+
+def render(template, action, **companies):
+    """
+    Fill template with the fields of each company, compacting the free-text
+    fields to fit the token budget of action. An action without a budget
+    only has its features deduplicated.
+    """
+    companies = {key: company_fields(company) for key, company in companies.items()}
+    budget = settings.AI_PROMPT_TOKEN_BUDGETS.get(action)
+    if budget is None:
+        return template.format(**{
+            key: {**fields, 'features': join_features(fields['features'])}
+            for key, fields in companies.items()
+        })
+
+    empty = {
+        key: {**fields, **{name: '' for name in FIELD_WEIGHTS}}
+        for key, fields in companies.items()
+    }
+    needs = {}
+    weights = {}
+    for key, fields in companies.items():
+        needs[key, 'description'] = count_tokens(fields['description'])
+        needs[key, 'features'] = count_tokens(join_features(fields['features']))
+        needs[key, 'market_position'] = count_tokens(fields['market_position'])
+        for name, weight in FIELD_WEIGHTS.items():
+            weights[key, name] = weight
+    shares = allocate(needs, weights, budget - count_tokens(template.format(**empty)))
+
+    compacted = {
+        key: {
+            **fields,
+            'description': summarize(fields['description'], shares[key, 'description']),
+            'features': join_features(fields['features'], shares[key, 'features']),
+            'market_position': summarize(fields['market_position'], shares[key, 'market_position']),
+        }
+        for key, fields in companies.items()
+    }
+    return template.format(**compacted)
+
+
+SEARCH_TEMPLATE = """
+        Search for companies that match the following query: "{query}"
+
+        Please return a JSON array of 5 companies with the following structure:
+        [
+            {{
+                "name": "Company Name",
+                "description": "Brief description of the company",
+                "website": "company website URL",
+                "industry": "Industry the company operates in",
+                "features": ["Feature 1", "Feature 2", "Feature 3"]
+            }}
+        ]
+
+        Only return the JSON array, no additional text.
+        """
+
+COMPANY_TEMPLATE = """
+        Provide detailed information about the company "{company_name}" in JSON format with the following structure:
+        {{
+            "name": "Full company name",
+            "description": "Detailed description of the company",
+            "website": "Official website URL",
+            "features": ["Feature 1", "Feature 2", "Feature 3", ...],
+            "market_position": "Description of market position"
+        }}
+
+        Only return the JSON object, no additional text.
+        """
+
+COMPANY_BATCH_TEMPLATE = """
+        Provide detailed information about each of the following companies:
+{companies}
+
+        Return a JSON array with exactly one object per company, in the same order, with the following structure:
+        [
+            {{
+                "query": "The company name exactly as given above",
+                "name": "Full company name",
+                "description": "Detailed description of the company",
+                "website": "Official website URL",
+                "features": ["Feature 1", "Feature 2", "Feature 3", ...],
+                "market_position": "Description of market position"
+            }}
+        ]
+
+        Only return the JSON array, no additional text.
+        """
+
+COMPARISON_TEMPLATE = """
+        Compare the following two companies:
+
+        Company 1: {company1[name]}
+        Description: {company1[description]}
+        Website: {company1[website]}
+        Features: {company1[features]}
+
+        Company 2: {company2[name]}
+        Description: {company2[description]}
+        Website: {company2[website]}
+        Features: {company2[features]}
+
+        Please provide a detailed comparison in JSON format with the following structure:
+        {{
+            "marketShare": {{
+                "company1": estimated market share percentage,
+                "company2": estimated market share percentage
+            }},
+            "revenue": {{
+                "company1": estimated revenue range,
+                "company2": estimated revenue range
+            }},
+            "strengths": {{
+                "company1": ["Strength 1", "Strength 2", "Strength 3"],
+                "company2": ["Strength 1", "Strength 2", "Strength 3"]
+            }},
+            "weaknesses": {{
+                "company1": ["Weakness 1", "Weakness 2", "Weakness 3"],
+                "company2": ["Weakness 1", "Weakness 2", "Weakness 3"]
+            }},
+            "featureComparison": [
+                {{
+                    "feature": "Feature name",
+                    "company1Has": true/false,
+                    "company2Has": true/false,
+                    "notes": "Any notes about this feature comparison"
+                }}
+            ],
+            "overallAnalysis": "Detailed analysis comparing the two companies"
+        }}
+
+        Only return the JSON object, no additional text.
+        """
+
+ANALYSIS_TEMPLATE = """
+        Analyze the following competitor and provide insights:
+        Name: {competitor[name]}
+        Description: {competitor[description]}
+        Website: {competitor[website]}
+        Features: {competitor[features]}
+        Market Position: {competitor[market_position]}
+
+        Please provide your analysis in JSON format with the following structure:
+        {{
+            "strengths": ["Key strength 1", "Key strength 2", ...],
+            "weaknesses": ["Weakness 1", "Weakness 2", ...],
+            "opportunities": ["Market opportunity 1", "Market opportunity 2", ...],
+            "threats": ["Potential threat 1", "Potential threat 2", ...],
+            "sentiment_score": overall market sentiment from 0 (very negative) to 1 (very positive),
+            "summary": "Short narrative of the insights above"
+        }}
+
+        Only return the JSON object, no additional text.
+        """
+
+
+def build_search_prompt(query):
+    return SEARCH_TEMPLATE.format(query=query)
+
+
+def build_company_prompt(company_name):
+    return COMPANY_TEMPLATE.format(company_name=company_name)
+
+
+def build_company_batch_prompt(company_names):
+    companies = '\n'.join(f'        - "{name}"' for name in company_names)
+    return COMPANY_BATCH_TEMPLATE.format(companies=companies)
+
+
+def build_comparison_prompt(company1, company2, action='compare'):
+    return render(COMPARISON_TEMPLATE, action, company1=company1, company2=company2)
+
+
+def build_analysis_prompt(competitor, action='analyze'):
+    return render(ANALYSIS_TEMPLATE, action, competitor=competitor)
@@ -34,5 +34,6 @@ class CompetitorAnalysisSerializer(serializers.ModelSerializer):
             'market_share',
             'ai_insights',
             'sentiment_score',
+            'insights_pruned',
         ]
-        read_only_fields = ['analysis_date'] 
\ No newline at end of file
+        read_only_fields = ['analysis_date', 'insights_pruned'] 
\ No newline at end of file
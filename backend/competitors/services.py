@@ -0,0 +1,81 @@
+import hashlib
+import json
+from .ai import generate
+from .extraction import extract_company, extract_comparison, extract_search_results
+from .models import CompetitorAnalysis
+from .prompts import (
+    build_analysis_prompt,
+    build_company_prompt,
+    build_comparison_prompt,
+    build_search_prompt,
+)
+from .swot import parse_analysis
+
+
+def analysis_input_hash(competitor):
+    """
+    Return a stable hash of the competitor fields that feed an analysis.
+    Two competitors with the same hash would produce the same prompt.
+    """
+    payload = json.dumps(
+        [
+            competitor.name,
+            competitor.description,
+            competitor.website,
+            competitor.features,
+            competitor.market_position,
+        ],
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def find_companies(query, user=None):
+    """
+    Ask Gemini for companies matching a free-text query.
+    """
+    return extract_search_results(generate(build_search_prompt(query), user=user, action='search'))
+
+
+def fetch_company_data(company_name, user=None):
+    """
+    Ask Gemini for information about a single company.
+    """
+    return extract_company(generate(build_company_prompt(company_name), user=user, action='fetch'))
+
+
+def generate_comparison(company1, company2, user=None):
+    """
+    Ask Gemini for a comparison of two companies.
+    """
+    return extract_comparison(generate(build_comparison_prompt(company1, company2), user=user, action='compare'))
+
+
+def run_analysis(competitor, user):
+    """
+    Run an AI analysis for a competitor and store the parsed SWOT lists and
+    sentiment score.
+    """
+    input_hash = analysis_input_hash(competitor)
+    parsed = parse_analysis(generate(build_analysis_prompt(competitor), user=user, action='analyze'))
+
+    # Create analysis record
+    analysis = CompetitorAnalysis.objects.create(
+        competitor=competitor,
+        created_by=user,
+        ai_insights=parsed['summary'],
+        input_hash=input_hash,
+        strengths=parsed['strengths'],
+        weaknesses=parsed['weaknesses'],
+        opportunities=parsed['opportunities'],
+        threats=parsed['threats'],
+        sentiment_score=parsed['sentiment_score'],
+    )
+
+    # Update competitor's last analyzed timestamp
+    competitor.last_analyzed = analysis.analysis_date
+    competitor.save(update_fields=['last_analyzed', 'updated_at'])
+
+    return analysis
+
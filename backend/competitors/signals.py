@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rivalradar.response_cache import invalidate
+from .models import Competitor, CompetitorAnalysis, SwotTerm
+from .swot import rebuild_index
+from .timeseries import apply_to_rollups
+
+
+# Fields of an analysis that determine its rollup buckets and sums.
+ROLLUP_FIELDS = ('competitor_id', 'analysis_date', 'sentiment_score', 'market_share')
+ROLLUP_UPDATE_FIELDS = frozenset(ROLLUP_FIELDS) | {'competitor'}
+
+
+@receiver(pre_save, sender=CompetitorAnalysis)
+def remember_rollup_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep the stored rollup fields of an analysis about to be updated, so
+    post_save can move it out of its old buckets.
+    """
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not ROLLUP_UPDATE_FIELDS.intersection(update_fields):
+        return
+    instance._rollup_previous = sender.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=CompetitorAnalysis)
+def add_analysis_to_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_to_rollups(instance, 1)
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous != {field: getattr(instance, field) for field in ROLLUP_FIELDS}:
+        apply_to_rollups(sender(**previous), -1)
+        apply_to_rollups(instance, 1)
+
+
+@receiver(post_delete, sender=CompetitorAnalysis)
+def remove_analysis_from_rollups(sender, instance, **kwargs):
+    apply_to_rollups(instance, -1)
+
+
+@receiver(post_save, sender=CompetitorAnalysis)
+@receiver(post_delete, sender=CompetitorAnalysis)
+def reindex_swot_terms(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rebuild_index(CompetitorAnalysis, SwotTerm, [instance.competitor_id])
+
+
+@receiver(post_save, sender=Competitor)
+@receiver(post_delete, sender=Competitor)
+def invalidate_competitor_responses(sender, instance, **kwargs):
+    invalidate('competitors', user_id=instance.created_by_id)
+
+
+@receiver(post_save, sender=CompetitorAnalysis)
+@receiver(post_delete, sender=CompetitorAnalysis)
+def invalidate_analysis_responses(sender, instance, **kwargs):
+    invalidate('competitor_analyses', user_id=instance.created_by_id)
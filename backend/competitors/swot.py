@@ -0,0 +1,227 @@
+"""
+Structured SWOT analyses and an inverted term index over them.
+
+The analyze pipeline parses the model's reply into strength, weakness,
+opportunity and threat lists plus a sentiment score. Each competitor's
+latest analysis is indexed as postings of (term, category, competitor,
+analysis), so filters such as ?weakness=pricing are answered from the
+index instead of scanning JSON columns.
+"""
+import re
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from .extraction import ExtractionError, extract_analysis
+
+# Query parameter -> (SwotTerm.category, CompetitorAnalysis field)
+CATEGORIES = {
+    'strength': ('strength', 'strengths'),
+    'weakness': ('weakness', 'weaknesses'),
+    'opportunity': ('opportunity', 'opportunities'),
+    'threat': ('threat', 'threats'),
+}
+
+_TERM = re.compile(r'[a-z0-9]+')
+_BULLET = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+_BOLD_LINE = re.compile(r'^(\*\*|__)(.+?)\1\s*:?$')
+_EMPHASIS = re.compile(r'\*\*|__')
+_NUMBER = re.compile(r'(-?\d+(?:\.\d+)?)\s*(%)?')
+
+STOPWORDS = frozenset(
+    'a an and are as at be but by can for from has have in into is it its of on or '
+    'that the their them they this to too was were will with not no very more most less also'.split()
+)
+
+# Heading keywords of each category in free-text replies.
+HEADINGS = {
+    'strengths': ('strength',),
+    'weaknesses': ('weakness',),
+    'opportunities': ('opportunit',),
+    'threats': ('threat',),
+    'sentiment_score': ('sentiment',),
+}
+
+# Exact names a bold line must have to count as a category heading.
+BOLD_HEADINGS = {
+    'strengths': 'strengths', 'strength': 'strengths',
+    'weaknesses': 'weaknesses', 'weakness': 'weaknesses',
+    'opportunities': 'opportunities', 'opportunity': 'opportunities',
+    'threats': 'threats', 'threat': 'threats',
+    'sentiment': 'sentiment_score', 'sentiment score': 'sentiment_score',
+}
+
+
+def stem(word):
+    """
+    Strip common English suffixes so that, for example, price, prices,
+    priced and pricing share a term.
+    """
+    if word.endswith('ss'):
+        return word
+    for suffix in ('ing', 'es', 'ed', 's', 'e'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def terms(text):
+    """
+    Return the distinct index terms of text, in order of appearance.
+    """
+    return list(dict.fromkeys(
+        stem(word) for word in _TERM.findall(str(text).lower())
+        if len(word) > 2 and word not in STOPWORDS
+    ))
+
+
+def parse_sentiment(value):
+    """
+    Return a sentiment score between 0 and 1, or None if value is not one.
+    Percentages are scaled down.
+    """
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match is None:
+            return None
+        value = float(match.group(1)) / (100 if match.group(2) else 1)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value) if 0 <= value <= 1 else None
+
+
+def _heading_field(label):
+    lowered = label.lower()
+    return next(
+        (field for field, keywords in HEADINGS.items() if any(k in lowered for k in keywords)),
+        None,
+    )
+
+
+def parse_heading(line):
+    """
+    Return (field, value) if line is a section heading, else None. Only
+    heading syntax counts: a markdown # heading, a whole-line bold category
+    name, or a label ending in a colon. field is None for a heading of
+    another section. value is the text after "Sentiment:" on the same line.
+    """
+    stripped = line.strip()
+    if stripped.startswith('#'):
+        return _heading_field(stripped.strip('#*_: ')), ''
+
+    text = _BULLET.sub('', stripped)
+    bold = _BOLD_LINE.match(text)
+    if bold:
+        return BOLD_HEADINGS.get(bold.group(2).strip().rstrip(':').strip().lower()), ''
+
+    if text.endswith(':'):
+        field = _heading_field(text.strip('*_: '))
+        return (field, '') if field is not None else None
+
+    label, colon, value = text.partition(':')
+    if colon and _heading_field(label.strip('*_ ')) == 'sentiment_score':
+        return 'sentiment_score', value
+    return None
+
+
+def parse_sections(text):
+    """
+    Parse a free-text reply with Strengths/Weaknesses/... headings followed
+    by bullet points, for replies that ignore the requested JSON format.
+    """
+    result = {field: [] for field in HEADINGS if field != 'sentiment_score'}
+    result['sentiment_score'] = None
+    current = None
+    for line in text.splitlines():
+        heading = parse_heading(line)
+        if heading is not None:
+            current, value = heading
+            if current == 'sentiment_score' and value.strip():
+                result['sentiment_score'] = parse_sentiment(value)
+            continue
+        content = _EMPHASIS.sub('', _BULLET.sub('', line)).strip()
+        if not content:
+            continue
+        if current == 'sentiment_score':
+            if result['sentiment_score'] is None:
+                result['sentiment_score'] = parse_sentiment(content)
+        elif current is not None:
+            result[current].append(content)
+    return result
+
+
+def parse_analysis(text):
+    """
+    Return SWOT lists, sentiment_score and a summary from a model reply.
+    """
+    try:
+        data = extract_analysis(text)
+    except ExtractionError:
+        data = parse_sections(text)
+        data['summary'] = text
+
+    parsed = {
+        field: [str(item).strip() for item in data.get(field) or [] if str(item).strip()]
+        for _, field in CATEGORIES.values()
+    }
+    parsed['sentiment_score'] = parse_sentiment(data.get('sentiment_score'))
+    parsed['summary'] = data.get('summary') or text
+    return parsed
+
+
+def latest_analyses(analysis_model, using='default'):
+    latest = analysis_model.objects.using(using).filter(
+        competitor=OuterRef('competitor')
+    ).order_by('-analysis_date', '-pk').values('pk')[:1]
+    return analysis_model.objects.using(using).filter(pk=Subquery(latest))
+
+
+def postings(analysis, term_model):
+    rows = []
+    for category, field in CATEGORIES.values():
+        seen = set()
+        for item in getattr(analysis, field) or []:
+            for term in terms(item):
+                if term not in seen:
+                    seen.add(term)
+                    rows.append(term_model(
+                        term=term[:64],
+                        category=category,
+                        competitor_id=analysis.competitor_id,
+                        analysis_id=analysis.pk,
+                    ))
+    return rows
+
+
+def rebuild_index(analysis_model, term_model, competitor_ids=None, using='default'):
+    """
+    Rebuild the postings of the latest analysis of each competitor. Models
+    are passed in so migrations can call this with historical models.
+    """
+    analyses = latest_analyses(analysis_model, using).only(
+        'pk', 'competitor_id', *(field for _, field in CATEGORIES.values())
+    )
+    existing = term_model.objects.using(using)
+    if competitor_ids is not None:
+        analyses = analyses.filter(competitor_id__in=competitor_ids)
+        existing = existing.filter(competitor_id__in=competitor_ids)
+
+    with transaction.atomic(using=using):
+        existing.delete()
+        rows = []
+        for analysis in analyses.iterator():
+            rows.extend(postings(analysis, term_model))
+        term_model.objects.using(using).bulk_create(rows, batch_size=500)
+
+
+def filter_competitors(queryset, term_model, category, text):
+    """
+    Restrict a Competitor queryset to those whose latest analysis mentions
+    every term of text in category.
+    """
+    query_terms = terms(text)
+    if not query_terms:
+        return queryset.none()
+    for term in query_terms:
+        queryset = queryset.filter(pk__in=term_model.objects.filter(
+            category=category, term=term
+        ).values('competitor_id'))
+    return queryset
@@ -0,0 +1,727 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import UsageLedger
+from users.quotas import QuotaExceeded
+from .ai import FairScheduler, generate
+from .batching import FetchBatcher
+from .comparisons import compare_all_pairs, compare_pair
+from .fields import ZLIB, compress, decompress
+from .extraction import COMPANY_SCHEMA, SEARCH_RESULTS_SCHEMA, ExtractionError, extract_json
+from .models import AICall, AnalysisRollup, CompanyComparison, Competitor, CompetitorAnalysis, IdempotencyKey
+from .prompts import allocate, build_analysis_prompt, build_comparison_prompt, count_tokens, dedupe, summarize
+from .timeseries import rebuild_rollups
+from .services import analysis_input_hash
+from .swot import parse_analysis, parse_sections, stem, terms
+
+User = get_user_model()
+
+ANALYSIS_REPLY = json.dumps({
+    'strengths': ['Strong brand'],
+    'weaknesses': ['High pricing'],
+    'opportunities': ['New markets'],
+    'threats': ['Cheaper rivals'],
+    'sentiment_score': 0.7,
+    'summary': 'A solid competitor.',
+})
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def make_competitor(user, name='Acme', **fields):
+    fields.setdefault('description', f'{name} makes things')
+    fields.setdefault('website', 'https://example.com')
+    fields.setdefault('market_position', 'Leader')
+    return Competitor.objects.create(name=name, created_by=user, **fields)
+
+
+# Analyses run on worker threads with their own connections, so the data
+# must be committed rather than held in a test transaction.
+class ScheduleAnalysesTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.stale = make_competitor(self.user, 'Stale')
+        self.unchanged = make_competitor(self.user, 'Unchanged')
+        CompetitorAnalysis.objects.create(
+            competitor=self.unchanged,
+            created_by=self.user,
+            ai_insights='',
+            input_hash=analysis_input_hash(self.unchanged),
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('schedule_analyses', '--rate=0', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_dry_run_reports_without_analyzing(self):
+        with mock.patch('competitors.services.generate') as generate:
+            output = self.run_command('--dry-run')
+
+        generate.assert_not_called()
+        self.assertIn('Would analyze Stale', output)
+        self.assertIn('Would analyze 1, skipped 1 unchanged, 0 failed.', output)
+        self.assertNotIn('Analyzed', output)
+        self.assertFalse(self.stale.analyses.exists())
+
+    def test_analyzes_only_changed_competitors(self):
+        with mock.patch('competitors.services.generate', return_value=ANALYSIS_REPLY) as generate:
+            output = self.run_command()
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertIn('Analyzed 1, skipped 1 unchanged, 0 failed.', output)
+        analysis = self.stale.analyses.get()
+        self.assertEqual(analysis.input_hash, analysis_input_hash(self.stale))
+        self.assertEqual(analysis.weaknesses, ['High pricing'])
+
+
+def company(name, **fields):
+    return {
+        'name': name,
+        'description': f'{name} makes things',
+        'website': f'https://{name.lower()}.example.com',
+        'features': ['Widgets'],
+        'market_position': 'Leader',
+        **fields,
+    }
+
+
+def fetched(name, user=None):
+    return company(name)
+
+
+class FetchBatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.batcher = FetchBatcher(window=0.2, max_size=3)
+
+    def fetch(self, names):
+        futures = [self.batcher.submit(name) for name in names]
+        return [future.result(timeout=5) for future in futures]
+
+    def test_batches_concurrent_requests_into_one_prompt(self):
+        reply = json.dumps([company(name, query=name) for name in ('Acme', 'Globex', 'Initech')])
+        with mock.patch('competitors.batching.generate', return_value=reply) as generate, \
+                mock.patch('competitors.batching.fetch_company_data') as fetch_single:
+            results = self.fetch(['Acme', 'Globex', 'Initech'])
+
+        self.assertEqual(generate.call_count, 1)
+        fetch_single.assert_not_called()
+        self.assertEqual([result['name'] for result in results], ['Acme', 'Globex', 'Initech'])
+        self.assertNotIn('query', results[0])
+
+    def test_matches_reordered_and_recased_query_echoes(self):
+        reply = json.dumps([
+            company('Microsoft Corp', query='MICROSOFT'),
+            company('Apple Inc', query=' APPLE '),
+        ])
+        with mock.patch('competitors.batching.generate', return_value=reply), \
+                mock.patch('competitors.batching.fetch_company_data') as fetch_single:
+            results = self.fetch(['apple', 'microsoft'])
+
+        fetch_single.assert_not_called()
+        self.assertEqual([result['name'] for result in results], ['Apple Inc', 'Microsoft Corp'])
+
+    def test_unmatched_echo_is_fetched_singly_not_by_position(self):
+        reply = json.dumps([company('Acme', query='Acme'), company('Initech', query='Initech')])
+        with mock.patch('competitors.batching.generate', return_value=reply), \
+                mock.patch('competitors.batching.fetch_company_data', side_effect=fetched) as fetch_single:
+            results = self.fetch(['Acme', 'Globex'])
+
+        fetch_single.assert_called_once_with('Globex', user=None)
+        self.assertEqual([result['name'] for result in results], ['Acme', 'Globex'])
+
+    def test_malformed_items_fall_back_to_single_fetch(self):
+        reply = json.dumps([company('Acme', query='Acme'), {'query': 'Globex', 'name': 'Globex'}])
+        with mock.patch('competitors.batching.generate', return_value=reply), \
+                mock.patch('competitors.batching.fetch_company_data', side_effect=fetched) as fetch_single:
+            results = self.fetch(['Acme', 'Globex'])
+
+        fetch_single.assert_called_once_with('Globex', user=None)
+        self.assertEqual([result['name'] for result in results], ['Acme', 'Globex'])
+
+    def test_failed_batch_falls_back_for_every_item(self):
+        with mock.patch('competitors.batching.generate', side_effect=RuntimeError('upstream error')), \
+                mock.patch('competitors.batching.fetch_company_data', side_effect=fetched) as fetch_single:
+            results = self.fetch(['Acme', 'Globex'])
+
+        self.assertEqual(fetch_single.call_count, 2)
+        self.assertEqual([result['name'] for result in results], ['Acme', 'Globex'])
+
+
+def comparison_of(company1, company2, user=None):
+    return {'company1': {'name': company1['name']}, 'company2': {'name': company2['name']}}
+
+
+class ComparePairTests(TestCase):
+    def test_reverse_order_reuses_stored_comparison(self):
+        acme, globex = company('Acme'), company('Globex')
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of) as generate:
+            first, first_cached = compare_pair(acme, globex)
+            second, second_cached = compare_pair(globex, acme)
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual((first_cached, second_cached), (False, True))
+        self.assertEqual(second, {'company1': {'name': 'Globex'}, 'company2': {'name': 'Acme'}})
+
+    def test_null_fields_do_not_break_hashing(self):
+        acme = company('Acme', description=None, features=None)
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of):
+            compare_pair(acme, company('Globex'))
+        self.assertEqual(CompanyComparison.objects.count(), 1)
+
+
+class CompareViewValidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+
+    def test_compare_rejects_null_name_before_calling_model(self):
+        with mock.patch('competitors.comparisons.generate_comparison') as generate:
+            response = self.client.post(
+                '/api/competitors/compare_companies/',
+                {'company1': {'name': None}, 'company2': company('Globex')},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'company1 must have a name')
+        generate.assert_not_called()
+
+    def test_compare_many_rejects_invalid_company(self):
+        with mock.patch('competitors.comparisons.generate_comparison') as generate:
+            response = self.client.post(
+                '/api/competitors/compare_many/',
+                {'companies': [company('Acme'), company('Globex', features='Widgets')]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'companies[1] features must be a list')
+        generate.assert_not_called()
+
+
+class CompareAllPairsTests(TransactionTestCase):
+    def test_completed_pairs_are_stored_when_another_fails(self):
+        companies = [company('Acme'), company('Globex'), company('Initech')]
+
+        def generate(company1, company2, user=None):
+            if 'Initech' in (company1['name'], company2['name']):
+                raise RuntimeError('upstream error')
+            return comparison_of(company1, company2)
+
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=generate):
+            with self.assertRaises(RuntimeError):
+                compare_all_pairs(companies)
+
+        stored = CompanyComparison.objects.get()
+        self.assertEqual({stored.first_name, stored.second_name}, {'Acme', 'Globex'})
+
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of) as retry:
+            results = compare_all_pairs(companies)
+        self.assertEqual(retry.call_count, 2)
+        self.assertEqual([result['cached'] for result in results], [True, False, False])
+
+
+class ExtractJsonTests(SimpleTestCase):
+    def test_plain_json(self):
+        text = json.dumps(company('Acme'))
+        self.assertEqual(extract_json(text, COMPANY_SCHEMA), company('Acme'))
+
+    def test_code_fence_and_prose_with_braces(self):
+        text = f'Note: fields in {{braces}} are estimates.\n```json\n{json.dumps(company("Acme"))}\n```\nDone {{ok}}'
+        self.assertEqual(extract_json(text, COMPANY_SCHEMA)['name'], 'Acme')
+
+    def test_skips_values_that_do_not_match_schema(self):
+        text = f'For example {{"name": 1}} or [1, 2].\n{json.dumps(company("Acme"))}'
+        self.assertEqual(extract_json(text, COMPANY_SCHEMA)['name'], 'Acme')
+
+    def test_repairs_trailing_commas(self):
+        text = json.dumps(company('Acme'), indent=2).replace('"Widgets"', '"Widgets",').replace('\n}', ',\n}')
+        self.assertEqual(extract_json(text, COMPANY_SCHEMA), company('Acme'))
+
+    def test_collects_bare_objects_into_a_list(self):
+        first = {'name': 'Acme', 'description': 'Widgets'}
+        second = {'name': 'Globex', 'description': 'Gadgets'}
+        text = f'{json.dumps(first)}\n{json.dumps(second)}'
+        self.assertEqual(extract_json(text, SEARCH_RESULTS_SCHEMA), [first, second])
+
+    def test_skips_unclosed_bracket_in_prose(self):
+        text = 'Note [see below:\n' + json.dumps(company('Acme'))
+        self.assertEqual(extract_json(text, COMPANY_SCHEMA), company('Acme'))
+
+    def test_skips_stray_quote_in_prose(self):
+        text = 'He said "hi [ and ' + json.dumps(company('Acme'))
+        self.assertEqual(extract_json(text, COMPANY_SCHEMA), company('Acme'))
+
+    def test_truncated_response_fails(self):
+        text = json.dumps(company('Acme'))[:40]
+        with self.assertRaises(ExtractionError):
+            extract_json(text, COMPANY_SCHEMA)
+
+    def test_response_without_json_fails(self):
+        with self.assertRaisesMessage(ExtractionError, 'Failed to parse AI response as JSON'):
+            extract_json('Sorry, I cannot help with that.', COMPANY_SCHEMA)
+
+    def test_reports_schema_mismatch(self):
+        with self.assertRaisesMessage(ExtractionError, '$.name: expected str'):
+            extract_json(json.dumps({**company('Acme'), 'name': 1}), COMPANY_SCHEMA)
+
+
+class IdempotencyTests(TestCase):
+    url = '/api/competitors/compare_companies/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.payload = {'company1': company('Acme'), 'company2': company('Globex')}
+
+    def post(self, payload=None, key='key-1'):
+        return self.client.post(self.url, payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of) as generate:
+            first = self.post()
+            CompanyComparison.objects.all().delete()
+            second = self.post()
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['X-Comparison-Cache'], 'miss')
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_concurrent_retry_conflicts_while_in_progress(self):
+        retries = []
+
+        def generate(company1, company2, user=None):
+            # The client retries while the first request is still running.
+            retries.append(self.post())
+            return comparison_of(company1, company2)
+
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=generate) as generate_mock:
+            response = self.post()
+
+        self.assertEqual(generate_mock.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(retries[0].status_code, 409)
+        self.assertEqual(retries[0]['Retry-After'], '1')
+        self.assertEqual(IdempotencyKey.objects.get().state, 'done')
+
+    def test_key_reused_for_different_request_is_rejected(self):
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of) as generate:
+            self.post()
+            response = self.post({'company1': company('Acme'), 'company2': company('Initech')})
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(response.status_code, 422)
+
+    def test_server_errors_are_not_stored(self):
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=RuntimeError('upstream error')):
+            response = self.post()
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of):
+            response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_expired_claim_is_taken_over(self):
+        IdempotencyKey.objects.create(
+            user=self.user,
+            key_hash=hashlib.sha256(b'key-1').hexdigest(),
+            fingerprint='abandoned',
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        with mock.patch('competitors.comparisons.generate_comparison', side_effect=comparison_of):
+            response = self.post()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(IdempotencyKey.objects.get().state, 'done')
+
+
+class CompressedTextFieldTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.competitor = make_competitor(self.user)
+
+    def stored_bytes(self, analysis):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT ai_insights FROM {CompetitorAnalysis._meta.db_table} WHERE id = %s', [analysis.pk]
+            )
+            return bytes(cursor.fetchone()[0])
+
+    @override_settings(AI_INSIGHTS_CODEC='zlib')
+    def test_long_text_is_stored_compressed(self):
+        text = 'Strong brand and a loyal customer base. ' * 100
+        analysis = CompetitorAnalysis.objects.create(competitor=self.competitor, created_by=self.user, ai_insights=text)
+
+        stored = self.stored_bytes(analysis)
+        self.assertEqual(stored[:1], ZLIB)
+        self.assertLess(len(stored), len(text) // 4)
+        self.assertEqual(CompetitorAnalysis.objects.get(pk=analysis.pk).ai_insights, text)
+
+    def test_short_text_is_stored_raw(self):
+        analysis = CompetitorAnalysis.objects.create(competitor=self.competitor, created_by=self.user, ai_insights='Short')
+        self.assertEqual(self.stored_bytes(analysis), b'rShort')
+        self.assertEqual(CompetitorAnalysis.objects.get(pk=analysis.pk).ai_insights, 'Short')
+
+    def test_decompress_handles_every_stored_form(self):
+        text = 'é' * 300
+        self.assertEqual(decompress(compress(text)), text)
+        self.assertEqual(decompress(memoryview(compress(text))), text)
+        self.assertEqual(decompress('uncompressed legacy value'), 'uncompressed legacy value')
+        with self.assertRaises(ValueError):
+            decompress(b'xdata')
+
+
+class PruneAnalysesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.competitor = make_competitor(self.user)
+        now = timezone.now()
+        self.analyses = []
+        for days_ago, score in ((90, 0.2), (60, 0.4), (45, 0.6)):
+            analysis = CompetitorAnalysis.objects.create(
+                competitor=self.competitor, created_by=self.user, ai_insights='Old insights', sentiment_score=score,
+            )
+            CompetitorAnalysis.objects.filter(pk=analysis.pk).update(analysis_date=now - timedelta(days=days_ago))
+            self.analyses.append(analysis)
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('prune_analyses', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        output = self.run_command('--dry-run')
+        self.assertIn('Would prune 2 analyses', output)
+        self.assertFalse(CompetitorAnalysis.objects.filter(insights_pruned=True).exists())
+
+    def test_prunes_old_analyses_into_summary_and_keeps_latest(self):
+        self.run_command('--keep-days=30')
+
+        oldest, older, latest = (CompetitorAnalysis.objects.get(pk=a.pk) for a in self.analyses)
+        self.assertEqual((oldest.ai_insights, oldest.insights_pruned), ('', True))
+        self.assertEqual((older.ai_insights, older.insights_pruned), ('', True))
+        self.assertEqual((latest.ai_insights, latest.insights_pruned), ('Old insights', False))
+
+        summary = self.competitor.analysis_summary
+        self.assertEqual(summary.analysis_count, 2)
+        self.assertEqual([point[1] for point in summary.series], [0.2, 0.4])
+        self.assertEqual(summary.first_analysis_date, oldest.analysis_date)
+
+        # Running again does not count the same analyses twice.
+        self.run_command('--keep-days=30')
+        summary.refresh_from_db()
+        self.assertEqual(summary.analysis_count, 2)
+
+
+class TimeseriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.competitor = make_competitor(self.user)
+        self.url = f'/api/competitors/{self.competitor.pk}/timeseries/'
+
+    def analyze(self, **metrics):
+        return CompetitorAnalysis.objects.create(
+            competitor=self.competitor, created_by=self.user, ai_insights='', **metrics
+        )
+
+    def rollups(self):
+        return sorted(AnalysisRollup.objects.values_list(
+            'period', 'period_start', 'analysis_count', 'sentiment_sum', 'sentiment_count',
+            'market_share_sum', 'market_share_count',
+        ))
+
+    def assertRollupsMatchRebuild(self):
+        incremental = self.rollups()
+        rebuild_rollups(CompetitorAnalysis, AnalysisRollup)
+        self.assertEqual(incremental, self.rollups())
+
+    def test_returns_average_per_bucket(self):
+        self.analyze(sentiment_score=0.2, market_share=10)
+        self.analyze(sentiment_score=0.6)
+
+        response = self.client.get(self.url, {'bucket': 'month'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['series']['sentiment_score'][0][1], 0.4)
+        self.assertEqual(response.data['series']['market_share'][0][1], 10)
+
+    def test_edited_metrics_update_rollups(self):
+        analysis = self.analyze(sentiment_score=0.2)
+        analysis.sentiment_score = 0.8
+        analysis.market_share = 25
+        analysis.save()
+
+        response = self.client.get(self.url, {'bucket': 'day'})
+        self.assertEqual(response.data['series']['sentiment_score'][0][1], 0.8)
+        self.assertEqual(response.data['series']['market_share'][0][1], 25)
+        self.assertRollupsMatchRebuild()
+
+        analysis.sentiment_score = None
+        analysis.save(update_fields=['sentiment_score'])
+        self.assertRollupsMatchRebuild()
+
+        analysis.delete()
+        self.assertRollupsMatchRebuild()
+
+    def test_invalid_dates_are_rejected(self):
+        for params in ({'start': '2024-02-30'}, {'end': 'yesterday'}, {'start': '2024-13-01'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_date_range_filters_buckets(self):
+        self.analyze(sentiment_score=0.5)
+        today = timezone.localdate()
+
+        response = self.client.get(self.url, {'start': (today + timedelta(days=1)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['series']['sentiment_score'], [])
+
+        response = self.client.get(self.url, {'start': today.isoformat(), 'end': today.isoformat()})
+        self.assertEqual(len(response.data['series']['sentiment_score']), 1)
+
+
+def gemini_reply(text, prompt_tokens=12, completion_tokens=5):
+    return mock.Mock(
+        text=text,
+        usage_metadata=mock.Mock(prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens),
+    )
+
+
+@override_settings(LLM_DAILY_QUOTAS={'viewer': {'requests': 1, 'tokens': None}})
+class GenerateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+
+    def test_records_call_and_usage(self):
+        with mock.patch('competitors.ai.model.generate_content', return_value=gemini_reply('Hello')):
+            self.assertEqual(generate('Say hello', user=self.user, action='greet'), 'Hello')
+
+        call = AICall.objects.get()
+        self.assertEqual((call.action, call.user, call.prompt_tokens, call.completion_tokens), ('greet', self.user, 12, 5))
+        ledger = UsageLedger.objects.get(user=self.user)
+        self.assertEqual((ledger.requests, ledger.prompt_tokens, ledger.completion_tokens), (1, 12, 5))
+
+    def test_exhausted_quota_stops_the_call(self):
+        with mock.patch('competitors.ai.model.generate_content', return_value=gemini_reply('Hello')) as call:
+            generate('Say hello', user=self.user)
+            with self.assertRaises(QuotaExceeded):
+                generate('Say hello again', user=self.user)
+        self.assertEqual(call.call_count, 1)
+
+    def test_quota_exceeded_during_action_returns_429(self):
+        competitor = make_competitor(self.user)
+        with mock.patch('competitors.services.generate', side_effect=QuotaExceeded(wait=60)):
+            response = client_for(self.user).post(f'/api/competitors/{competitor.pk}/analyze/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+
+
+class FairSchedulerTests(SimpleTestCase):
+    def test_light_flow_is_served_before_heavy_backlog(self):
+        scheduler = FairScheduler(concurrency=1)
+        order = []
+
+        def request(flow):
+            scheduler.acquire(flow, 1, 10)
+            order.append(flow)
+            scheduler.release()
+
+        # Hold the only slot while both flows queue up.
+        scheduler.acquire('holder', 1, 0)
+        threads = [threading.Thread(target=request, args=('heavy',)) for _ in range(3)]
+        threads.append(threading.Thread(target=request, args=('light',)))
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        scheduler.release()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertLess(order.index('light'), 2)
+
+
+LONG_DESCRIPTION = ' '.join(
+    f'Sentence {index} about the platform and its many integrations.' for index in range(400)
+)
+
+
+@override_settings(AI_PROMPT_TOKEN_BUDGETS={'analyze': 300, 'compare': 500})
+class PromptCompactionTests(SimpleTestCase):
+    def test_analysis_prompt_fits_budget(self):
+        competitor = company('Acme', description=LONG_DESCRIPTION, features=[f'Feature {n}' for n in range(200)])
+        prompt = build_analysis_prompt(competitor)
+
+        self.assertLessEqual(count_tokens(prompt), 300)
+        self.assertIn('Sentence 0 about the platform', prompt)
+        self.assertNotIn('Sentence 399', prompt)
+        self.assertRegex(prompt, r'\(\+\d+ more\)')
+        self.assertEqual(build_analysis_prompt(competitor), prompt)
+
+    def test_comparison_prompt_fits_budget(self):
+        prompt = build_comparison_prompt(
+            company('Acme', description=LONG_DESCRIPTION), company('Globex', description=LONG_DESCRIPTION),
+        )
+        self.assertLessEqual(count_tokens(prompt), 500)
+        self.assertIn('Company 1: Acme', prompt)
+        self.assertIn('Company 2: Globex', prompt)
+
+    def test_short_fields_are_kept_whole(self):
+        prompt = build_analysis_prompt(company('Acme', features=['SSO', ' sso ', 'API', 'api.']))
+        self.assertIn('Description: Acme makes things', prompt)
+        self.assertIn('Features: SSO, API', prompt)
+
+    def test_action_without_budget_only_dedupes_features(self):
+        competitor = company('Acme', description=LONG_DESCRIPTION, features=['SSO', 'SSO'])
+        prompt = build_analysis_prompt(competitor, action=None)
+        self.assertIn('Sentence 399', prompt)
+        self.assertIn('Features: SSO\n', prompt)
+
+    def test_helpers(self):
+        self.assertEqual(dedupe(['Price tracking', 'price-tracking', ' Alerts ']), ['Price tracking', 'Alerts'])
+        self.assertEqual(summarize('One. One. Two.', 2), 'One.')
+        self.assertEqual(
+            allocate({'a': 10, 'b': 100}, {'a': 1, 'b': 1}, 60),
+            {'a': 10, 'b': 50},
+        )
+
+
+FREE_TEXT_REPLY = """Here is my analysis of Acme.
+
+## Strengths
+- Strong brand
+- Weak pricing strength
+**Weaknesses**
+1. High pricing
+2. **Support**: slow replies
+Opportunities:
+* Expansion into Asia
+### Threats to the business
+- Cheaper rivals
+## Summary
+Solid company overall.
+Sentiment score: 72%
+"""
+
+
+class SwotParsingTests(SimpleTestCase):
+    def test_only_heading_syntax_starts_a_section(self):
+        self.assertEqual(parse_sections(FREE_TEXT_REPLY), {
+            'strengths': ['Strong brand', 'Weak pricing strength'],
+            'weaknesses': ['High pricing', 'Support: slow replies'],
+            'opportunities': ['Expansion into Asia'],
+            'threats': ['Cheaper rivals'],
+            'sentiment_score': 0.72,
+        })
+
+    def test_sentiment_on_the_next_line(self):
+        sections = parse_sections('**Sentiment**\n0.4\n- Threat: none')
+        self.assertEqual(sections['sentiment_score'], 0.4)
+        self.assertEqual(sections['threats'], [])
+
+    def test_bold_line_must_equal_category_name(self):
+        sections = parse_sections('## Weaknesses\n**Pricing strength**\n- Slow support')
+        self.assertEqual(sections['strengths'], [])
+        self.assertEqual(sections['weaknesses'], [])
+
+    def test_parse_analysis_prefers_json(self):
+        parsed = parse_analysis(f'Sure! {ANALYSIS_REPLY}')
+        self.assertEqual(parsed['weaknesses'], ['High pricing'])
+        self.assertEqual(parsed['sentiment_score'], 0.7)
+        self.assertEqual(parsed['summary'], 'A solid competitor.')
+
+    def test_parse_analysis_falls_back_to_sections(self):
+        parsed = parse_analysis(FREE_TEXT_REPLY)
+        self.assertEqual(parsed['strengths'], ['Strong brand', 'Weak pricing strength'])
+        self.assertEqual(parsed['summary'], FREE_TEXT_REPLY)
+
+    def test_terms_are_stemmed_and_deduplicated(self):
+        self.assertEqual([stem(word) for word in ('pricing', 'prices', 'priced', 'business')],
+                         ['pric', 'pric', 'pric', 'business'])
+        self.assertEqual(terms('High prices and pricing of the API'), ['high', 'pric', 'api'])
+
+
+class SwotFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.acme = make_competitor(self.user, 'Acme')
+        self.globex = make_competitor(self.user, 'Globex')
+        parsed = parse_analysis(FREE_TEXT_REPLY)
+        CompetitorAnalysis.objects.create(
+            competitor=self.acme, created_by=self.user,
+            **{field: parsed[field] for field in ('strengths', 'weaknesses', 'opportunities', 'threats')},
+        )
+        CompetitorAnalysis.objects.create(
+            competitor=self.globex, created_by=self.user, strengths=['Low pricing'], weaknesses=['Slow support'],
+        )
+
+    def names(self, **params):
+        response = self.client.get('/api/competitors/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['name'] for item in response.data['results'])
+
+    def test_filters_on_latest_analysis_terms(self):
+        self.assertEqual(self.names(weakness='pricing'), ['Acme'])
+        self.assertEqual(self.names(weakness='support'), ['Acme', 'Globex'])
+        self.assertEqual(self.names(strength='prices'), ['Acme', 'Globex'])
+        self.assertEqual(self.names(weakness='support', strength='brand'), ['Acme'])
+        self.assertEqual(self.names(threat='regulation'), [])
+
+    def test_newer_analysis_replaces_terms(self):
+        CompetitorAnalysis.objects.create(competitor=self.acme, created_by=self.user, weaknesses=['Small team'])
+        self.assertEqual(self.names(weakness='pricing'), [])
+        self.assertEqual(self.names(weakness='team'), ['Acme'])
+
+
+class OwnerScopingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.other = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        self.client = client_for(self.user)
+        self.acme = make_competitor(self.user, 'Acme', market_position='Leader')
+        self.initech = make_competitor(self.other, 'Initech', market_position='Niche')
+        CompetitorAnalysis.objects.create(competitor=self.initech, created_by=self.other, sentiment_score=0.2)
+
+    def test_list_and_overview_only_include_own_competitors(self):
+        response = self.client.get('/api/competitors/')
+        self.assertEqual([item['name'] for item in response.data['results']], ['Acme'])
+
+        response = self.client.get('/api/competitors/market_overview/')
+        self.assertEqual(response.data['total_competitors'], 1)
+        self.assertEqual(response.data['market_positions'], ['Leader'])
+        self.assertEqual(list(response.data['recent_analyses']), [])
+
+    def test_other_users_competitors_are_not_found(self):
+        url = f'/api/competitors/{self.initech.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.patch(url, {'name': 'Mine'}, format='json').status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertEqual(self.client.get(f'{url}timeseries/').status_code, 404)
+        with mock.patch('competitors.services.generate') as generate_mock:
+            self.assertEqual(self.client.post(f'{url}analyze/').status_code, 404)
+        generate_mock.assert_not_called()
+
+        self.initech.refresh_from_db()
+        self.assertEqual(self.initech.name, 'Initech')
@@ -0,0 +1,149 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from .models import AnalysisRollup
+
+PERIODS = ('day', 'week', 'month')
+METRICS = ('sentiment_score', 'market_share')
+
+# Prefix of the rollup sum/count columns for each metric.
+METRIC_COLUMNS = {'sentiment_score': 'sentiment', 'market_share': 'market_share'}
+
+
+def period_start(moment, period):
+    """
+    Return the first day of the period containing moment.
+    Weeks start on Monday, matching TruncWeek.
+    """
+    day = timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def apply_to_rollups(analysis, sign):
+    """
+    Add (sign=1) or remove (sign=-1) an analysis from its day, week and
+    month rollups with in-database increments.
+    """
+    increments = {'analysis_count': F('analysis_count') + sign}
+    if analysis.sentiment_score is not None:
+        increments['sentiment_sum'] = F('sentiment_sum') + sign * analysis.sentiment_score
+        increments['sentiment_count'] = F('sentiment_count') + sign
+    if analysis.market_share is not None:
+        increments['market_share_sum'] = F('market_share_sum') + sign * analysis.market_share
+        increments['market_share_count'] = F('market_share_count') + sign
+
+    with transaction.atomic():
+        for period in PERIODS:
+            start = period_start(analysis.analysis_date, period)
+            if sign > 0:
+                rollup, _ = AnalysisRollup.objects.get_or_create(
+                    competitor_id=analysis.competitor_id, period=period, period_start=start
+                )
+                AnalysisRollup.objects.filter(pk=rollup.pk).update(**increments)
+            else:
+                AnalysisRollup.objects.filter(
+                    competitor_id=analysis.competitor_id, period=period, period_start=start
+                ).update(**increments)
+        if sign < 0:
+            # Drop buckets left without analyses, as a rebuild would.
+            AnalysisRollup.objects.filter(
+                competitor_id=analysis.competitor_id, analysis_count__lte=0
+            ).delete()
+
+
+def rebuild_rollups(analysis_model, rollup_model, competitor_ids=None, using='default'):
+    """
+    Recompute rollups from raw analyses. Models are passed in so migrations
+    can call this with historical models.
+    """
+    analyses = analysis_model.objects.using(using)
+    rollups = rollup_model.objects.using(using)
+    if competitor_ids is not None:
+        analyses = analyses.filter(competitor_id__in=competitor_ids)
+        rollups = rollups.filter(competitor_id__in=competitor_ids)
+
+    with transaction.atomic(using=using):
+        rollups.delete()
+        for period in PERIODS:
+            rows = analyses.annotate(
+                period_start=Trunc('analysis_date', period, output_field=DateField())
+            ).order_by().values('competitor_id', 'period_start').annotate(
+                analysis_count=Count('pk'),
+                sentiment_sum=Coalesce(Sum('sentiment_score'), 0.0),
+                sentiment_count=Count('sentiment_score'),
+                market_share_sum=Coalesce(Sum('market_share'), 0.0),
+                market_share_count=Count('market_share'),
+            )
+            rollup_model.objects.using(using).bulk_create(
+                [rollup_model(period=period, **row) for row in rows],
+                batch_size=500,
+            )
+
+
+def lttb(points, threshold):
+    """
+    Downsample (x, y) points to at most threshold points with the
+    Largest-Triangle-Three-Buckets algorithm, which keeps the visual shape
+    of the series. x values must be numeric and sorted.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third triangle vertex.
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_points = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(point[0] for point in next_points) / len(next_points)
+        avg_y = sum(point[1] for point in next_points) / len(next_points)
+
+        ax, ay = points[previous]
+        best_area = -1
+        best = start
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = index
+        sampled.append(points[best])
+        previous = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def series(competitor, metric, period, target_points, start=None, end=None):
+    """
+    Return [[period_start, average], ...] for a metric, downsampled to
+    target_points.
+    """
+    column = METRIC_COLUMNS[metric]
+    rollups = AnalysisRollup.objects.filter(
+        competitor=competitor,
+        period=period,
+        **{f'{column}_count__gt': 0},
+    ).order_by('period_start')
+    if start is not None:
+        rollups = rollups.filter(period_start__gte=start)
+    if end is not None:
+        rollups = rollups.filter(period_start__lte=end)
+
+    rows = rollups.values_list('period_start', f'{column}_sum', f'{column}_count')
+    points = [(day.toordinal(), total / count, day) for day, total, count in rows]
+    sampled = lttb([(x, y) for x, y, _ in points], target_points)
+    days = {x: day for x, _, day in points}
+    return [[days[x].isoformat(), round(y, 4)] for x, y in sampled]
@@ -1,26 +1,63 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from .models import Competitor, CompetitorAnalysis
+from .models import Competitor, CompetitorAnalysis, SwotTerm
 from .serializers import CompetitorSerializer, CompetitorAnalysisSerializer
-import google.generativeai as genai
+from .services import fetch_company_data, find_companies, run_analysis
+from .batching import get_fetch_batcher
+from .comparisons import company_error, compare_all_pairs, compare_pair
+from .idempotency import idempotent
 from django.conf import settings
-import json
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from django.utils.dateparse import parse_date
+from rivalradar.mixins import MultiGetMixin
+from rivalradar.response_cache import cached_response
+from users.quotas import check_quota
+from .timeseries import METRICS, PERIODS, series as metric_series
+from .swot import CATEGORIES, filter_competitors
 
-# Initialize the Gemini model
-genai.configure(api_key=settings.GEMINI_API_KEY)  # Get API key from Django settings
-model = genai.GenerativeModel('gemini-pro')
 
-class CompetitorViewSet(viewsets.ModelViewSet):
+def ai_error_response(error):
+    """
+    Answer a failed AI action with 500. API exceptions, such as the
+    QuotaExceeded that generate() raises when another request used up the
+    quota first, are re-raised so DRF answers them with their own status.
+    """
+    if isinstance(error, APIException):
+        raise error
+    return Response(
+        {'error': str(error)},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
+
+
+class CompetitorViewSet(MultiGetMixin, viewsets.ModelViewSet):
     queryset = Competitor.objects.all()
     serializer_class = CompetitorSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return super().get_queryset().filter(created_by=self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    def filter_queryset(self, queryset):
+        """
+        Filter by terms in the latest analysis, e.g. ?weakness=pricing or
+        ?strength=support&threat=regulation. Every term must match.
+        """
+        queryset = super().filter_queryset(queryset)
+        for param, (category, _) in CATEGORIES.items():
+            for value in self.request.query_params.getlist(param):
+                queryset = filter_competitors(queryset, SwotTerm, category, value)
+        return queryset
+
+    @cached_response('competitor_list', depends_on=['competitors', 'competitor_analyses'])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=['post'])
     def search_companies(self, request):
         """
@@ -34,56 +71,17 @@ class CompetitorViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Prepare prompt for Gemini AI
-        prompt = f"""
-        Search for companies that match the following query: "{query}"
-        
-        Please return a JSON array of 5 companies with the following structure:
-        [
-            {{
-                "name": "Company Name",
-                "description": "Brief description of the company",
-                "website": "company website URL",
-                "industry": "Industry the company operates in",
-                "features": ["Feature 1", "Feature 2", "Feature 3"]
-            }}
-        ]
-        
-        Only return the JSON array, no additional text.
-        """
+        check_quota(request.user)
 
         try:
-            # Get AI response
-            response = model.generate_content(prompt)
-            
-            # Extract JSON from response
-            try:
-                # Try to parse the response as JSON directly
-                companies = json.loads(response.text)
-            except json.JSONDecodeError:
-                # If direct parsing fails, try to extract JSON from the text
-                text = response.text
-                start_idx = text.find('[')
-                end_idx = text.rfind(']') + 1
-                
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = text[start_idx:end_idx]
-                    companies = json.loads(json_str)
-                else:
-                    return Response(
-                        {'error': 'Failed to parse AI response as JSON'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-            
+            companies = find_companies(query, user=request.user)
             return Response(companies, status=status.HTTP_200_OK)
 
         except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return ai_error_response(e)
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def compare_companies(self, request):
         """
         Compare two companies using Gemini AI and return detailed analysis.
@@ -96,85 +94,59 @@ class CompetitorViewSet(viewsets.ModelViewSet):
                 {'error': 'Both company1 and company2 parameters are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        error = company_error(company1, 'company1') or company_error(company2, 'company2')
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Prepare prompt for Gemini AI
-        prompt = f"""
-        Compare the following two companies:
-        
-        Company 1: {company1.get('name', '')}
-        Description: {company1.get('description', '')}
-        Website: {company1.get('website', '')}
-        Features: {', '.join(company1.get('features', []))}
-        
-        Company 2: {company2.get('name', '')}
-        Description: {company2.get('description', '')}
-        Website: {company2.get('website', '')}
-        Features: {', '.join(company2.get('features', []))}
-        
-        Please provide a detailed comparison in JSON format with the following structure:
-        {{
-            "marketShare": {{
-                "company1": estimated market share percentage,
-                "company2": estimated market share percentage
-            }},
-            "revenue": {{
-                "company1": estimated revenue range,
-                "company2": estimated revenue range
-            }},
-            "strengths": {{
-                "company1": ["Strength 1", "Strength 2", "Strength 3"],
-                "company2": ["Strength 1", "Strength 2", "Strength 3"]
-            }},
-            "weaknesses": {{
-                "company1": ["Weakness 1", "Weakness 2", "Weakness 3"],
-                "company2": ["Weakness 1", "Weakness 2", "Weakness 3"]
-            }},
-            "featureComparison": [
-                {{
-                    "feature": "Feature name",
-                    "company1Has": true/false,
-                    "company2Has": true/false,
-                    "notes": "Any notes about this feature comparison"
-                }}
-            ],
-            "overallAnalysis": "Detailed analysis comparing the two companies"
-        }}
-        
-        Only return the JSON object, no additional text.
-        """
+        check_quota(request.user)
 
         try:
-            # Get AI response
-            response = model.generate_content(prompt)
-            
-            # Extract JSON from response
-            try:
-                # Try to parse the response as JSON directly
-                comparison = json.loads(response.text)
-            except json.JSONDecodeError:
-                # If direct parsing fails, try to extract JSON from the text
-                text = response.text
-                start_idx = text.find('{')
-                end_idx = text.rfind('}') + 1
-                
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = text[start_idx:end_idx]
-                    comparison = json.loads(json_str)
-                else:
-                    return Response(
-                        {'error': 'Failed to parse AI response as JSON'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-            
-            return Response(comparison, status=status.HTTP_200_OK)
+            comparison, cached = compare_pair(company1, company2, user=request.user)
+            response = Response(comparison, status=status.HTTP_200_OK)
+            response['X-Comparison-Cache'] = 'hit' if cached else 'miss'
+            return response
 
         except Exception as e:
+            return ai_error_response(e)
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def compare_many(self, request):
+        """
+        Compare every pair of the given companies, reusing cached pairwise
+        comparisons and computing only the missing ones.
+        """
+        companies = request.data.get('companies')
+        if (
+            not isinstance(companies, list)
+            or len(companies) < 2
+            or not all(isinstance(company, dict) for company in companies)
+        ):
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'companies must be a list of at least two companies'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(companies) > settings.AI_COMPARE_MANY_MAX_COMPANIES:
+            return Response(
+                {'error': f'At most {settings.AI_COMPARE_MANY_MAX_COMPANIES} companies can be compared at once'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        errors = (company_error(company, f'companies[{index}]') for index, company in enumerate(companies))
+        error = next(filter(None, errors), None)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        check_quota(request.user)
+
+        try:
+            comparisons = compare_all_pairs(companies, user=request.user)
+            return Response({'comparisons': comparisons}, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return ai_error_response(e)
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def fetch_from_ai(self, request):
         """
         Fetch competitor information from Gemini AI and create a new competitor.
@@ -186,43 +158,16 @@ class CompetitorViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Prepare prompt for Gemini AI
-        prompt = f"""
-        Provide detailed information about the company "{company_name}" in JSON format with the following structure:
-        {{
-            "name": "Full company name",
-            "description": "Detailed description of the company",
-            "website": "Official website URL",
-            "features": ["Feature 1", "Feature 2", "Feature 3", ...],
-            "market_position": "Description of market position"
-        }}
-        
-        Only return the JSON object, no additional text.
-        """
+        check_quota(request.user)
 
         try:
-            # Get AI response
-            response = model.generate_content(prompt)
-            
-            # Extract JSON from response
-            try:
-                # Try to parse the response as JSON directly
-                company_data = json.loads(response.text)
-            except json.JSONDecodeError:
-                # If direct parsing fails, try to extract JSON from the text
-                text = response.text
-                start_idx = text.find('{')
-                end_idx = text.rfind('}') + 1
-                
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = text[start_idx:end_idx]
-                    company_data = json.loads(json_str)
-                else:
-                    return Response(
-                        {'error': 'Failed to parse AI response as JSON'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-            
+            # Get company data from Gemini, batched with concurrent requests if enabled
+            if settings.AI_FETCH_BATCHING:
+                future = get_fetch_batcher().submit(company_name, user=request.user)
+                company_data = future.result(timeout=settings.AI_FETCH_BATCH_TIMEOUT)
+            else:
+                company_data = fetch_company_data(company_name, user=request.user)
+
             # Create new competitor
             serializer = self.get_serializer(data=company_data)
             serializer.is_valid(raise_exception=True)
@@ -231,64 +176,77 @@ class CompetitorViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return ai_error_response(e)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def analyze(self, request, pk=None):
         competitor = self.get_object()
-        
-        # Prepare prompt for Gemini AI
-        prompt = f"""
-        Analyze the following competitor and provide insights:
-        Name: {competitor.name}
-        Description: {competitor.description}
-        Website: {competitor.website}
-        Features: {', '.join(competitor.features)}
-        Market Position: {competitor.market_position}
-        
-        Please provide:
-        1. Key strengths
-        2. Weaknesses
-        3. Market opportunities
-        4. Potential threats
-        5. Sentiment analysis
-        """
-
-        try:
-            # Get AI analysis
-            response = model.generate_content(prompt)
-            ai_insights = response.text
-
-            # Create analysis record
-            analysis = CompetitorAnalysis.objects.create(
-                competitor=competitor,
-                created_by=request.user,
-                ai_insights=ai_insights,
-                # You would need to parse the AI response to extract these
-                strengths=["Strength 1", "Strength 2"],
-                weaknesses=["Weakness 1", "Weakness 2"],
-                opportunities=["Opportunity 1", "Opportunity 2"],
-                threats=["Threat 1", "Threat 2"],
-                sentiment_score=0.75  # This would be calculated from the AI response
-            )
 
-            # Update competitor's last analyzed timestamp
-            competitor.last_analyzed = analysis.analysis_date
-            competitor.save()
+        check_quota(request.user)
 
+        try:
+            analysis = run_analysis(competitor, request.user)
             serializer = CompetitorAnalysisSerializer(analysis)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
+            return ai_error_response(e)
+
+    @action(detail=True, methods=['get'])
+    def timeseries(self, request, pk=None):
+        """
+        Return sentiment_score and market_share history bucketed by day,
+        week or month, downsampled to at most `points` points per metric.
+        """
+        competitor = self.get_object()
+        period = request.query_params.get('bucket', 'day')
+        metric = request.query_params.get('metric')
+        dates = {}
+        for param in ('start', 'end'):
+            value = request.query_params.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                dates[param] = None
+            if value and dates[param] is None:
+                return Response(
+                    {'error': f'{param} must be a valid date in YYYY-MM-DD format'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if period not in PERIODS:
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': f"bucket must be one of {', '.join(PERIODS)}"},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        if metric is not None and metric not in METRICS:
+            return Response(
+                {'error': f"metric must be one of {', '.join(METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            points = int(request.query_params.get('points', settings.TIMESERIES_DEFAULT_POINTS))
+        except ValueError:
+            return Response(
+                {'error': 'points must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        points = max(3, min(points, settings.TIMESERIES_MAX_POINTS))
+
+        metrics = [metric] if metric else METRICS
+        data = {
+            'competitor': competitor.pk,
+            'bucket': period,
+            'series': {
+                name: metric_series(competitor, name, period, points, dates['start'], dates['end'])
+                for name in metrics
+            },
+        }
+        return Response(data)
 
     @action(detail=False, methods=['get'])
+    @cached_response('market_overview', depends_on=['competitors', 'competitor_analyses'])
     def market_overview(self, request):
         competitors = self.get_queryset()
         data = {
@@ -0,0 +1,144 @@
+"""
+Admission control for LLM-backed endpoints.
+
+Each process tracks its in-flight requests. AI actions are admitted only
+while fewer than ADMISSION_MAX_LLM_INFLIGHT of them are running and the
+process still has more than ADMISSION_RESERVED_SLOTS free slots, so cheap
+CRUD and read requests can always get through when Gemini is slow. AI
+requests over the limit wait in a short bounded queue and are then shed
+with 503 and Retry-After.
+"""
+import math
+import re
+import threading
+import time
+from django.conf import settings
+from django.http import JsonResponse
+
+LLM = 'llm'
+OTHER = 'other'
+
+LLM_PATH = re.compile(r'/(analyze|fetch_from_ai|compare_companies|compare_many|search_companies)/?$')
+
+
+def classify(request):
+    if request.method == 'POST' and LLM_PATH.search(request.path):
+        return LLM
+    return OTHER
+
+
+class AdmissionController:
+    def __init__(self, max_inflight, max_llm_inflight, reserved_slots, max_queue, queue_timeout):
+        self.max_inflight = max_inflight
+        self.max_llm_inflight = max_llm_inflight
+        self.reserved_slots = reserved_slots
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.inflight = {LLM: 0, OTHER: 0}
+        self.admitted = {LLM: 0, OTHER: 0}
+        self.shed = {LLM: 0, OTHER: 0}
+        self.queued = 0
+        # Moving average of LLM request duration, used for Retry-After.
+        self.llm_latency = 1.0
+
+    def _can_admit(self, kind):
+        total = self.inflight[LLM] + self.inflight[OTHER]
+        if kind == LLM:
+            return (
+                self.inflight[LLM] < self.max_llm_inflight
+                and total < self.max_inflight - self.reserved_slots
+            )
+        return total < self.max_inflight
+
+    def acquire(self, kind):
+        """
+        Admit a request, waiting in the queue for LLM requests. Returns
+        False if the request must be shed.
+        """
+        with self._condition:
+            if not self._can_admit(kind):
+                if kind != LLM or self.queued >= self.max_queue or self.queue_timeout <= 0:
+                    self.shed[kind] += 1
+                    return False
+                self.queued += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while not self._can_admit(kind):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.shed[kind] += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.inflight[kind] += 1
+            self.admitted[kind] += 1
+            return True
+
+    def release(self, kind, duration):
+        with self._condition:
+            self.inflight[kind] -= 1
+            if kind == LLM:
+                self.llm_latency = 0.8 * self.llm_latency + 0.2 * duration
+            self._condition.notify_all()
+
+    def retry_after(self):
+        return max(1, math.ceil(self.llm_latency))
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'inflight': dict(self.inflight),
+                'queue_depth': self.queued,
+                'admitted': dict(self.admitted),
+                'shed': dict(self.shed),
+                'llm_latency_seconds': round(self.llm_latency, 3),
+                'limits': {
+                    'max_inflight': self.max_inflight,
+                    'max_llm_inflight': self.max_llm_inflight,
+                    'reserved_slots': self.reserved_slots,
+                    'max_queue': self.max_queue,
+                    'queue_timeout': self.queue_timeout,
+                },
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                max_inflight=settings.ADMISSION_MAX_INFLIGHT,
+                max_llm_inflight=settings.ADMISSION_MAX_LLM_INFLIGHT,
+                reserved_slots=settings.ADMISSION_RESERVED_SLOTS,
+                max_queue=settings.ADMISSION_MAX_QUEUE,
+                queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            )
+        return _controller
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        controller = get_controller()
+        kind = classify(request)
+        if not controller.acquire(kind):
+            response = JsonResponse(
+                {'error': 'Server is busy, please retry later'},
+                status=503,
+            )
+            response['Retry-After'] = str(controller.retry_after())
+            return response
+
+        started = time.monotonic()
+        try:
+            return self.get_response(request)
+        finally:
+            controller.release(kind, time.monotonic() - started)
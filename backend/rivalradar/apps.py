@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class RivalRadarConfig(AppConfig):
+    name = 'rivalradar'
+
+    def ready(self):
+        from . import db  # noqa: F401
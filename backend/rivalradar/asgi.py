@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rivalradar.settings')
 
-application = get_asgi_application() 
\ No newline at end of file
+django_application = get_asgi_application()
+
+# Imported after Django is set up; the push channel uses models and settings.
+from sync.push import PushRouter  # noqa: E402
+
+application = PushRouter(django_application) 
\ No newline at end of file
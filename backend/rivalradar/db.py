@@ -0,0 +1,104 @@
+import hashlib
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set once the current request (or command) has written to the primary.
+# Later reads in the same context go to the primary so they see the write.
+_pinned = ContextVar('db_pinned_to_primary', default=False)
+_wrote = ContextVar('db_wrote', default=False)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Use WAL so readers don't block the writer, and relax fsync to once per
+    checkpoint, which is safe with WAL.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+def closing_connections(func):
+    """
+    Wrap a function submitted to a thread pool so the worker thread's
+    database connections are closed when it returns. Django only closes
+    connections at the end of a request, which never happens on worker
+    threads, so each one would otherwise hold a connection open.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the replica and writes to the primary. After a write,
+    reads are pinned to the primary for the rest of the request and, via
+    ReplicaPinningMiddleware, for REPLICA_PIN_SECONDS afterwards for the
+    same client so it reads its own writes despite replication lag.
+    """
+
+    def db_for_read(self, model, **hints):
+        if REPLICA_ALIAS not in settings.DATABASES or _pinned.get():
+            return 'default'
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def _client_key(request):
+    credentials = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'db:pinned:' + hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
+
+class ReplicaPinningMiddleware:
+    """
+    Reset routing state per request and pin clients that recently wrote to
+    the primary database. Pins are kept in REPLICA_PIN_CACHE_ALIAS; when
+    that cache is per-process (LocMem) a pin only covers requests served by
+    the worker that handled the write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = _client_key(request)
+        cache = caches[settings.REPLICA_PIN_CACHE_ALIAS]
+        pinned = _pinned.set(bool(key and cache.get(key)))
+        wrote = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if key and (_wrote.get() or request.method not in SAFE_METHODS):
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+            return response
+        finally:
+            _pinned.reset(pinned)
+            _wrote.reset(wrote)
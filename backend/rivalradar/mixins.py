@@ -0,0 +1,36 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class MultiGetMixin:
+    """
+    Let list endpoints fetch specific objects with ?ids=1,2,3 in one round
+    trip. The response is an unpaginated list in the order of the ids;
+    unknown ids are skipped.
+    """
+
+    def list(self, request, *args, **kwargs):
+        ids = request.query_params.get('ids')
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            pks = list(dict.fromkeys(int(pk) for pk in ids.split(',') if pk.strip()))
+        except ValueError:
+            return Response(
+                {'error': 'ids must be a comma-separated list of integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(pks) > settings.MULTI_GET_MAX_IDS:
+            return Response(
+                {'error': f'At most {settings.MULTI_GET_MAX_IDS} ids can be fetched at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        objects = {
+            obj.pk: obj
+            for obj in self.filter_queryset(self.get_queryset()).filter(pk__in=pks)
+        }
+        serializer = self.get_serializer([objects[pk] for pk in pks if pk in objects], many=True)
+        return Response(serializer.data)
@@ -0,0 +1,148 @@
+"""
+Response caching for hot read endpoints.
+
+Cached responses are keyed by view, user, query parameters and the current
+generation of every data set the view depends on. Model signals bump those
+generations, which makes the old entries unreachable, so invalidation is
+exact without scanning the cache.
+
+Entries stay fresh for RESPONSE_CACHE_TTL seconds and may then be served
+stale for up to RESPONSE_CACHE_STALE_TTL seconds while a single request
+recomputes them.
+"""
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+PREFIX = 'respcache'
+STATS = ('hit', 'stale', 'miss')
+REVALIDATE_LOCK_TIMEOUT = 30
+
+# View names registered with cached_response, for stats reporting.
+registry = set()
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _generation_key(dependency, user_id=None):
+    if user_id is None:
+        return f'{PREFIX}:gen:{dependency}'
+    return f'{PREFIX}:gen:{dependency}:{user_id}'
+
+
+def invalidate(dependency, user_id=None):
+    """
+    Invalidate every cached response that depends on a data set, either for
+    all users or only for one user.
+    """
+    cache = _cache()
+    key = _generation_key(dependency, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Start from the clock so an evicted counter never reuses a value.
+        cache.add(key, time.time_ns(), None)
+
+
+def _generations(dependencies, user_id):
+    cache = _cache()
+    keys = []
+    for dependency in dependencies:
+        keys.append(_generation_key(dependency))
+        keys.append(_generation_key(dependency, user_id))
+    values = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in values}
+    for key, value in missing.items():
+        if not cache.add(key, value, None):
+            missing[key] = cache.get(key, value)
+    return ':'.join(str(values.get(key, missing.get(key))) for key in keys)
+
+
+def _record(name, outcome):
+    cache = _cache()
+    key = f'{PREFIX}:stats:{name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def stats():
+    """
+    Return hit, stale and miss counts and the hit ratio for each cached view.
+    """
+    cache = _cache()
+    report = {}
+    for name in sorted(registry):
+        counts = cache.get_many([f'{PREFIX}:stats:{name}:{outcome}' for outcome in STATS])
+        row = {outcome: counts.get(f'{PREFIX}:stats:{name}:{outcome}', 0) for outcome in STATS}
+        total = sum(row.values())
+        row['hit_ratio'] = round((row['hit'] + row['stale']) / total, 4) if total else None
+        report[name] = row
+    return report
+
+
+def _build(entry, outcome):
+    response = Response(entry['data'], status=entry['status'])
+    response['X-Cache'] = outcome.upper()
+    return response
+
+
+def cached_response(name, depends_on):
+    """
+    Cache a viewset action's successful responses per user and query string.
+    depends_on names the data sets whose invalidation must evict the entry.
+    """
+    registry.add(name)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            cache = _cache()
+            user_id = request.user.pk
+            params = hashlib.sha256(
+                request.GET.urlencode().encode('utf-8')
+                + repr(sorted(kwargs.items())).encode('utf-8')
+            ).hexdigest()
+            generations = _generations(depends_on, user_id)
+            key = f'{PREFIX}:{name}:{user_id}:{hashlib.sha256(generations.encode()).hexdigest()}:{params}'
+
+            entry = cache.get(key)
+            if entry is not None:
+                if entry['fresh_until'] > time.time():
+                    _record(name, 'hit')
+                    return _build(entry, 'hit')
+                # Stale: serve it unless we win the right to revalidate.
+                if not cache.add(f'{key}:revalidating', True, REVALIDATE_LOCK_TIMEOUT):
+                    _record(name, 'stale')
+                    return _build(entry, 'stale')
+
+            _record(name, 'miss')
+            try:
+                response = view_func(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(
+                        key,
+                        {
+                            'data': response.data,
+                            'status': response.status_code,
+                            'fresh_until': time.time() + settings.RESPONSE_CACHE_TTL,
+                        },
+                        settings.RESPONSE_CACHE_TTL + settings.RESPONSE_CACHE_STALE_TTL,
+                    )
+            finally:
+                # Release the lock even if the view raised, so the next
+                # request retries instead of serving stale data until it expires.
+                cache.delete(f'{key}:revalidating')
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
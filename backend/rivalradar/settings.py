@@ -32,6 +32,8 @@ INSTALLED_APPS = [
     'competitors',
     'analysis',
     'users',
+    'sync',
+    'rivalradar.apps.RivalRadarConfig',
 ]
 
 MIDDLEWARE = [
@@ -39,7 +41,10 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # After CorsMiddleware so shed requests still carry CORS headers.
+    'rivalradar.admission.AdmissionControlMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'rivalradar.db.ReplicaPinningMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -70,13 +75,70 @@ TEMPLATES = [
 WSGI_APPLICATION = 'rivalradar.wsgi.application'
 
 # Database
+def database_config(url):
+    config = env.db_url_config(url)
+    # Reuse connections across requests and check them before reuse.
+    config['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=60)
+    config['CONN_HEALTH_CHECKS'] = True
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        # Relative SQLite paths are relative to the backend directory.
+        if config['NAME'] != ':memory:' and not os.path.isabs(config['NAME']):
+            config['NAME'] = str(BASE_DIR / config['NAME'])
+        # Seconds to wait for a lock before raising "database is locked",
+        # unless DATABASE_URL sets one (e.g. ?timeout=5).
+        config.setdefault('OPTIONS', {}).setdefault('timeout', env.int('SQLITE_BUSY_TIMEOUT', default=20))
+    return config
+
+
 DATABASES = {
+    'default': database_config(env('DATABASE_URL', default='sqlite:///db.sqlite3')),
+}
+
+# Optional read replica; reads are routed to it by rivalradar.db.ReadReplicaRouter
+DATABASE_REPLICA_URL = env('DATABASE_REPLICA_URL', default='')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = database_config(DATABASE_REPLICA_URL)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['rivalradar.db.ReadReplicaRouter']
+
+# Seconds a client keeps reading from the primary after writing to it
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+# Pins must be visible to every worker for a write on one to pin reads on
+# another; with a per-process cache they only apply within one process
+REPLICA_PIN_CACHE_ALIAS = 'shared'
+
+# Cache
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rivalradar',
+    },
+    # Cache shared by every worker process, for state that must agree across
+    # processes (e.g. SHARED_CACHE_URL=redis://localhost:6379/1)
+    'shared': env.cache_url('SHARED_CACHE_URL', default='locmemcache://rivalradar-shared'),
+    # Cached API responses; set RESPONSE_CACHE_DIR to share them between processes
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env('RESPONSE_CACHE_DIR'),
+    } if env('RESPONSE_CACHE_DIR', default='') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rivalradar-responses',
+    },
 }
 
+# Admission control for LLM-backed endpoints (per process)
+ADMISSION_MAX_INFLIGHT = env.int('ADMISSION_MAX_INFLIGHT', default=64)
+ADMISSION_MAX_LLM_INFLIGHT = env.int('ADMISSION_MAX_LLM_INFLIGHT', default=16)
+ADMISSION_RESERVED_SLOTS = env.int('ADMISSION_RESERVED_SLOTS', default=8)  # kept free for non-AI requests
+ADMISSION_MAX_QUEUE = env.int('ADMISSION_MAX_QUEUE', default=16)
+ADMISSION_QUEUE_TIMEOUT = env.float('ADMISSION_QUEUE_TIMEOUT', default=2)  # seconds
+
+# Response cache for hot read endpoints
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TTL = env.int('RESPONSE_CACHE_TTL', default=60)  # seconds fresh
+RESPONSE_CACHE_STALE_TTL = env.int('RESPONSE_CACHE_STALE_TTL', default=300)  # seconds servable while revalidating
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,7 +172,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -135,6 +197,31 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Push channel (SSE and WebSocket, served by rivalradar/asgi.py)
+EVENTS_BROKER = env('EVENTS_BROKER', default='sync.broker.InProcessBroker')
+EVENTS_QUEUE_SIZE = env.int('EVENTS_QUEUE_SIZE', default=100)  # events buffered per client
+EVENTS_KEEPALIVE = env.float('EVENTS_KEEPALIVE', default=15)  # seconds
+EVENTS_RETRY_MS = env.int('EVENTS_RETRY_MS', default=5000)  # SSE reconnect delay
+EVENTS_MAX_COMPETITORS = env.int('EVENTS_MAX_COMPETITORS', default=100)
+
+# Maximum number of objects fetched with ?ids= on list endpoints
+MULTI_GET_MAX_IDS = env.int('MULTI_GET_MAX_IDS', default=100)
+
+# Changes feed page sizes
+SYNC_PAGE_SIZE = env.int('SYNC_PAGE_SIZE', default=500)
+SYNC_MAX_PAGE_SIZE = env.int('SYNC_MAX_PAGE_SIZE', default=5000)
+# The sync cursor never moves past changes younger than this, so a change
+# whose transaction commits after a later id is still returned
+SYNC_SETTLE_SECONDS = env.int('SYNC_SETTLE_SECONDS', default=10)
+
+# Seconds an authenticated user stays cached between JWT requests
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', default=300)
+AUTH_USER_CACHE_ALIAS = 'shared'
+# A per-process cache cannot propagate deactivation or password changes to
+# other workers, so users are only cached in it when this is set (single
+# process deployments such as runserver).
+AUTH_USER_CACHE_ALLOW_LOCAL = env.bool('AUTH_USER_CACHE_ALLOW_LOCAL', default=DEBUG)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -149,6 +236,52 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # Gemini AI settings
 GEMINI_API_KEY = env('GEMINI_API_KEY', default='')
 
+# Fair scheduling of Gemini calls between users, weighted by role
+LLM_MAX_CONCURRENCY = env.int('LLM_MAX_CONCURRENCY', default=8)
+LLM_ROLE_WEIGHTS = {
+    'admin': 4,
+    'analyst': 2,
+    'viewer': 1,
+}
+
+# Daily Gemini quotas by role; None means unlimited
+LLM_DAILY_QUOTAS = {
+    'admin': None,
+    'analyst': {'requests': 500, 'tokens': 2_000_000},
+    'viewer': {'requests': 50, 'tokens': 200_000},
+}
+# Quota counters must be shared by every worker process; with a per-process
+# cache the ledger is read on each check instead
+QUOTA_CACHE_ALIAS = 'shared'
+
+# Token budgets for prompts that embed company fields; longer descriptions
+# and feature lists are compacted to fit. Actions not listed are not compacted.
+AI_PROMPT_TOKEN_BUDGETS = {
+    'analyze': env.int('AI_ANALYZE_PROMPT_TOKENS', default=600),
+    'compare': env.int('AI_COMPARE_PROMPT_TOKENS', default=1200),
+}
+
+# Micro-batching of fetch_from_ai requests into multi-company prompts
+AI_FETCH_BATCHING = env.bool('AI_FETCH_BATCHING', default=False)
+AI_FETCH_BATCH_WINDOW = env.float('AI_FETCH_BATCH_WINDOW', default=0.05)  # seconds
+AI_FETCH_BATCH_SIZE = env.int('AI_FETCH_BATCH_SIZE', default=8)
+AI_FETCH_BATCH_TIMEOUT = env.float('AI_FETCH_BATCH_TIMEOUT', default=60)  # seconds
+
+# N-way company comparisons
+AI_COMPARE_MANY_MAX_COMPANIES = env.int('AI_COMPARE_MANY_MAX_COMPANIES', default=6)
+AI_COMPARE_MANY_WORKERS = env.int('AI_COMPARE_MANY_WORKERS', default=4)
+
+# Compression codec for CompetitorAnalysis.ai_insights ('zlib', or 'zstd' if zstandard is installed)
+AI_INSIGHTS_CODEC = env('AI_INSIGHTS_CODEC', default='zlib')
+
+# Competitor time-series endpoint
+TIMESERIES_DEFAULT_POINTS = env.int('TIMESERIES_DEFAULT_POINTS', default=200)
+TIMESERIES_MAX_POINTS = env.int('TIMESERIES_MAX_POINTS', default=2000)
+
+# Idempotency-Key support for AI POST actions
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24)  # seconds
+IDEMPOTENCY_LOCK_TIMEOUT = env.int('IDEMPOTENCY_LOCK_TIMEOUT', default=300)  # seconds
+
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -0,0 +1,246 @@
+import threading
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from competitors.models import Competitor
+from users.models import CustomUser
+from . import db, response_cache
+from .admission import LLM, OTHER, AdmissionController
+from .settings import database_config
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    def test_sqlite_gets_default_busy_timeout(self):
+        config = database_config('sqlite:////tmp/rivalradar.db')
+        self.assertEqual(config['OPTIONS'], {'timeout': 20})
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+    def test_url_options_are_kept(self):
+        config = database_config('sqlite:////tmp/rivalradar.db?timeout=5&check_same_thread=false')
+        self.assertEqual(config['OPTIONS']['timeout'], 5)
+        self.assertIn('check_same_thread', config['OPTIONS'])
+
+    def test_relative_sqlite_path_is_under_backend(self):
+        config = database_config('sqlite:///db.sqlite3')
+        self.assertTrue(config['NAME'].endswith('/backend/db.sqlite3'))
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db.ReadReplicaRouter()
+        self.pinned = db._pinned.set(False)
+
+    def tearDown(self):
+        db._pinned.reset(self.pinned)
+
+    def test_reads_use_primary_without_replica(self):
+        self.assertEqual(self.router.db_for_read(Competitor), 'default')
+
+    @mock.patch.dict(settings.DATABASES, {db.REPLICA_ALIAS: {}})
+    def test_reads_go_to_replica_until_a_write(self):
+        self.assertEqual(self.router.db_for_read(Competitor), db.REPLICA_ALIAS)
+        self.assertEqual(self.router.db_for_write(Competitor), 'default')
+        self.assertEqual(self.router.db_for_read(Competitor), 'default')
+
+
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].clear()
+        self.factory = RequestFactory(HTTP_AUTHORIZATION='Bearer token')
+
+    def handle(self, request, write=False):
+        seen = {}
+
+        def get_response(request):
+            seen['pinned'] = db._pinned.get()
+            if write:
+                db.ReadReplicaRouter().db_for_write(Competitor)
+            return HttpResponse()
+
+        db.ReplicaPinningMiddleware(get_response)(request)
+        return seen['pinned']
+
+    def test_client_reads_primary_after_writing(self):
+        self.assertFalse(self.handle(self.factory.get('/')))
+        self.assertFalse(self.handle(self.factory.post('/'), write=True))
+        self.assertTrue(self.handle(self.factory.get('/')))
+
+        other_client = RequestFactory(HTTP_AUTHORIZATION='Bearer other').get('/')
+        self.assertFalse(self.handle(other_client))
+
+    def test_pin_is_kept_in_the_pin_cache(self):
+        self.handle(self.factory.post('/'), write=True)
+        caches['default'].clear()
+        self.assertTrue(self.handle(self.factory.get('/')))
+
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].clear()
+        self.assertFalse(self.handle(self.factory.get('/')))
+
+    def test_routing_state_does_not_leak_between_requests(self):
+        token = db._pinned.set(False)
+        try:
+            self.handle(RequestFactory().post('/'), write=True)
+            self.assertFalse(db._pinned.get())
+        finally:
+            db._pinned.reset(token)
+
+
+class ResponseCacheTests(TestCase):
+    url = '/api/competitors/'
+
+    def setUp(self):
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        self.alice = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.bob = CustomUser.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        self.client = client_for(self.alice)
+
+    def add_competitor(self, user, name='Acme'):
+        return Competitor.objects.create(
+            name=name, description='', website='https://example.com', market_position='Leader', created_by=user,
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_owner_write_invalidates_only_that_user(self):
+        self.client.get(self.url)
+        self.add_competitor(self.bob)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        self.add_competitor(self.alice)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_query_parameters_are_cached_separately(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, {'weakness': 'pricing'})['X-Cache'], 'MISS')
+
+    @override_settings(RESPONSE_CACHE_TTL=0)
+    def test_stale_entry_is_served_while_another_request_revalidates(self):
+        self.client.get(self.url)
+        concurrent = []
+        record = response_cache._record
+
+        def record_and_race(name, outcome):
+            record(name, outcome)
+            if outcome == 'miss' and not concurrent:
+                # Another request arrives while this one recomputes.
+                concurrent.append(self.client.get(self.url))
+
+        with mock.patch('rivalradar.response_cache._record', side_effect=record_and_race):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(concurrent[0]['X-Cache'], 'STALE')
+
+    @override_settings(RESPONSE_CACHE_TTL=0)
+    def test_failed_revalidation_releases_the_lock(self):
+        self.client.get(self.url)
+        with mock.patch('rest_framework.mixins.ListModelMixin.list', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.client.get(self.url)
+
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_stats_count_outcomes(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='pw', is_staff=True,
+        )
+
+        response = client_for(admin).get('/api/ops/cache/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['competitor_list'], {'hit': 1, 'stale': 0, 'miss': 1, 'hit_ratio': 0.5})
+        self.assertEqual(self.client.get('/api/ops/cache/').status_code, 403)
+
+
+def controller(**limits):
+    limits = {
+        'max_inflight': 4, 'max_llm_inflight': 2, 'reserved_slots': 1, 'max_queue': 0, 'queue_timeout': 0,
+        **limits,
+    }
+    return AdmissionController(**limits)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def test_llm_requests_are_capped(self):
+        admission = controller()
+        self.assertTrue(admission.acquire(LLM))
+        self.assertTrue(admission.acquire(LLM))
+        self.assertFalse(admission.acquire(LLM))
+        self.assertEqual(admission.snapshot()['shed'], {LLM: 1, OTHER: 0})
+
+    def test_reserved_slots_stay_free_for_other_requests(self):
+        admission = controller(max_llm_inflight=4)
+        for _ in range(3):
+            self.assertTrue(admission.acquire(LLM))
+        self.assertFalse(admission.acquire(LLM))
+        self.assertTrue(admission.acquire(OTHER))
+        self.assertFalse(admission.acquire(OTHER))
+
+    def test_queued_request_is_admitted_when_a_slot_frees(self):
+        admission = controller(max_llm_inflight=1, max_queue=1, queue_timeout=5)
+        admission.acquire(LLM)
+        timer = threading.Timer(0.05, admission.release, (LLM, 3.0))
+        timer.start()
+        self.assertTrue(admission.acquire(LLM))
+        timer.join()
+        self.assertEqual(admission.retry_after(), 2)
+
+    def test_queue_wait_times_out(self):
+        admission = controller(max_llm_inflight=1, max_queue=1, queue_timeout=0.01)
+        admission.acquire(LLM)
+        self.assertFalse(admission.acquire(LLM))
+
+
+class AdmissionControlMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+
+    def test_shed_response_has_retry_after_and_cors_headers(self):
+        admission = controller(max_llm_inflight=0)
+        with mock.patch('rivalradar.admission.get_controller', return_value=admission):
+            response = self.client.post(
+                '/api/competitors/search_companies/', {'query': 'crm'}, format='json',
+                HTTP_ORIGIN='http://localhost:3000',
+            )
+            other = self.client.get('/api/competitors/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'http://localhost:3000')
+        self.assertEqual(other.status_code, 200)
+
+
+class ClosingConnectionsTests(SimpleTestCase):
+    def test_connections_are_closed_after_return_and_error(self):
+        @db.closing_connections
+        def work(fail):
+            if fail:
+                raise RuntimeError('failed')
+            return 'done'
+
+        with mock.patch('rivalradar.db.connections') as thread_connections:
+            self.assertEqual(work(False), 'done')
+            with self.assertRaises(RuntimeError):
+                work(True)
+        self.assertEqual(thread_connections.close_all.call_count, 2)
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from . import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -14,4 +15,7 @@ urlpatterns = [
     path('api/competitors/', include('competitors.urls')),
     path('api/analysis/', include('analysis.urls')),
     path('api/users/', include('users.urls')),
+    path('api/sync/', include('sync.urls')),
+    path('api/ops/cache/', views.cache_stats, name='cache_stats'),
+    path('api/ops/admission/', views.admission_stats, name='admission_stats'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) 
\ No newline at end of file
@@ -0,0 +1,23 @@
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from . import response_cache
+from .admission import get_controller
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """
+    Report hit, stale and miss counts and hit ratios of cached endpoints.
+    """
+    return Response(response_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def admission_stats(request):
+    """
+    Report in-flight requests, queue depth and shed counts for this process.
+    """
+    return Response(get_controller().snapshot())
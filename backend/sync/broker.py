@@ -0,0 +1,136 @@
+"""
+Publish/subscribe of push events.
+
+Events are published to named channels such as 'user:3' or
+'competitor:12' and delivered to every subscription listening on at least
+one of them, once per event. The broker is chosen with EVENTS_BROKER; the
+default InProcessBroker fans out within a single ASGI process, so a
+deployment with several processes needs a broker backed by a shared
+message bus that implements the same interface.
+"""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+RESYNC = {'type': 'resync'}
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def competitor_channel(competitor_id):
+    return f'competitor:{competitor_id}'
+
+
+class Subscription:
+    """
+    A bounded queue of events for one client, owned by an event loop.
+    A client that falls behind loses its queued events and receives a
+    single resync event, after which it should catch up from the changes
+    feed.
+    """
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        # Runs on self.loop.
+        if self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            event = RESYNC
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """
+        Return the next event, or None if none arrives within timeout.
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker(ABC):
+    """
+    Interface of push event brokers. publish may be called from any thread.
+    """
+
+    @abstractmethod
+    def publish(self, channels, event):
+        """
+        Deliver event to every subscription listening on any of channels.
+        """
+
+    @abstractmethod
+    def subscribe(self, channels):
+        """
+        Return a Subscription to channels for the running event loop.
+        """
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """
+        Stop delivering events to subscription.
+        """
+
+
+class InProcessBroker(Broker):
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.EVENTS_QUEUE_SIZE
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._subscribers.get(channel, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down.
+                self.unsubscribe(subscription)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.EVENTS_BROKER)()
+        return _broker
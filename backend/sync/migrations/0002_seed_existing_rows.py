@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def seed_changes(apps, schema_editor):
+    """
+    Record a 'created' change for rows that existed before the feed, so a
+    client syncing from cursor 0 receives everything.
+    """
+    alias = schema_editor.connection.alias
+    Change = apps.get_model('sync', 'Change')
+    sources = [
+        ('competitor', apps.get_model('competitors', 'Competitor')),
+        ('competitor_analysis', apps.get_model('competitors', 'CompetitorAnalysis')),
+        ('analysis', apps.get_model('analysis', 'Analysis')),
+    ]
+    for name, model in sources:
+        rows = model.objects.using(alias).order_by('pk').values_list('pk', 'created_by_id')
+        Change.objects.using(alias).bulk_create(
+            (
+                Change(model=name, object_id=pk, action='created', owner_id=owner_id)
+                for pk, owner_id in rows.iterator(chunk_size=1000)
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('competitors', '0006_analysisrollup'),
+        ('analysis', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
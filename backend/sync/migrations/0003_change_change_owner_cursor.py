@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_seed_existing_rows'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['owner_id', 'id'], name='change_owner_cursor'),
+        ),
+    ]
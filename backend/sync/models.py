@@ -0,0 +1,36 @@
+from django.db import models
+
+class Change(models.Model):
+    """
+    One entry in the changes feed. The auto-incrementing id is the sync
+    cursor clients pass back as ?since=. Ids are assigned at insert, so
+    concurrent transactions can commit them out of order; the feed holds
+    the cursor back by SYNC_SETTLE_SECONDS to pick up late commits.
+    """
+    MODEL_CHOICES = [
+        ('competitor', 'Competitor'),
+        ('competitor_analysis', 'Competitor analysis'),
+        ('analysis', 'Analysis'),
+    ]
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+
+    model = models.CharField(max_length=30, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Not a foreign key: tombstones must outlive the user whose deletion
+    # cascaded to the tracked rows.
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.action}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['owner_id', 'id'], name='change_owner_cursor'),
+        ]
@@ -0,0 +1,202 @@
+"""
+Push channel served next to Django by the ASGI application.
+
+Clients open either a WebSocket on /ws/events/ or a Server-Sent Events
+stream on /api/events/stream/, passing their JWT access token as ?token=.
+By default they receive the events of their own user channel; passing
+?competitor=<id> (repeatable) subscribes to those competitors instead.
+Events are small JSON objects with a type such as analysis.created,
+competitor.updated or competitor.analyzed; clients fetch the full objects
+when they need them. A resync event means events were dropped and the
+client should catch up from the changes feed.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from competitors.models import Competitor
+from users.authentication import CachedJWTAuthentication
+from .broker import competitor_channel, get_broker, user_channel
+
+SSE_PATH = '/api/events/stream/'
+WEBSOCKET_PATH = '/ws/events/'
+
+# WebSocket close codes in the application range.
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_BAD_REQUEST = 4400
+
+
+class SubscriptionError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _authenticate(token):
+    authentication = CachedJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _resolve_channels(query_string):
+    """
+    Authenticate the token in the query string and return the channels to
+    subscribe to. Raises SubscriptionError for a bad request.
+    """
+    params = parse_qs(query_string.decode('latin-1'))
+    token = (params.get('token') or [''])[0]
+    user = _authenticate(token) if token else None
+    if user is None:
+        raise SubscriptionError(401, 'A valid access token is required')
+
+    competitor_ids = params.get('competitor', [])
+    if not competitor_ids:
+        return {user_channel(user.pk)}
+    try:
+        competitor_ids = {int(pk) for pk in competitor_ids}
+    except ValueError:
+        raise SubscriptionError(400, 'competitor must be an integer')
+    if len(competitor_ids) > settings.EVENTS_MAX_COMPETITORS:
+        raise SubscriptionError(
+            400, f'At most {settings.EVENTS_MAX_COMPETITORS} competitors can be subscribed to'
+        )
+    found = Competitor.objects.filter(pk__in=competitor_ids, created_by=user).count()
+    if found != len(competitor_ids):
+        raise SubscriptionError(400, 'Unknown competitor ids')
+    return {competitor_channel(pk) for pk in competitor_ids}
+
+
+resolve_channels = sync_to_async(_resolve_channels)
+
+
+def _cors_headers(scope):
+    headers = dict(scope.get('headers', []))
+    origin = headers.get(b'origin', b'').decode('latin-1')
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+    return []
+
+
+async def _json_response(send, scope, status, data):
+    body = json.dumps(data).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')] + _cors_headers(scope),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _events(subscription, receive, disconnect_type):
+    """
+    Yield events for the subscription, or None after each keepalive
+    interval without one, until the client disconnects. Other messages
+    from the client are ignored.
+    """
+    receiving = asyncio.ensure_future(receive())
+    getting = asyncio.ensure_future(subscription.get(settings.EVENTS_KEEPALIVE))
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiving, getting}, return_when=asyncio.FIRST_COMPLETED)
+            if receiving in done:
+                if receiving.result()['type'] == disconnect_type:
+                    return
+                receiving = asyncio.ensure_future(receive())
+            if getting in done:
+                yield getting.result()
+                getting = asyncio.ensure_future(subscription.get(settings.EVENTS_KEEPALIVE))
+    finally:
+        receiving.cancel()
+        getting.cancel()
+
+
+async def sse_application(scope, receive, send):
+    if scope['method'] != 'GET':
+        await _json_response(send, scope, 405, {'error': 'Method not allowed'})
+        return
+    try:
+        channels = await resolve_channels(scope['query_string'])
+    except SubscriptionError as e:
+        await _json_response(send, scope, e.status, {'error': str(e)})
+        return
+
+    subscription = get_broker().subscribe(channels)
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ] + _cors_headers(scope),
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {settings.EVENTS_RETRY_MS}\n\n'.encode('utf-8'),
+            'more_body': True,
+        })
+        async for event in _events(subscription, receive, 'http.disconnect'):
+            if event is None:
+                chunk = ': keepalive\n\n'
+            else:
+                chunk = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+    finally:
+        subscription.close()
+
+
+async def websocket_application(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    try:
+        channels = await resolve_channels(scope['query_string'])
+    except SubscriptionError as e:
+        code = CLOSE_UNAUTHORIZED if e.status == 401 else CLOSE_BAD_REQUEST
+        await send({'type': 'websocket.close', 'code': code})
+        return
+
+    subscription = get_broker().subscribe(channels)
+    try:
+        await send({'type': 'websocket.accept'})
+        async for event in _events(subscription, receive, 'websocket.disconnect'):
+            if event is not None:
+                await send({'type': 'websocket.send', 'text': json.dumps(event)})
+    finally:
+        subscription.close()
+
+
+class PushRouter:
+    """
+    Serve the push endpoints and hand every other request to Django.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'websocket':
+            if scope['path'] == WEBSOCKET_PATH:
+                await websocket_application(scope, receive, send)
+            else:
+                await receive()
+                await send({'type': 'websocket.close', 'code': 1000})
+            return
+        if scope['type'] == 'http' and scope['path'] == SSE_PATH:
+            await sse_application(scope, receive, send)
+            return
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        await self.django_application(scope, receive, send)
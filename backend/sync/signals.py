@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from analysis.models import Analysis
+from competitors.models import Competitor, CompetitorAnalysis
+from .broker import competitor_channel, get_broker, user_channel
+from .models import Change
+
+TRACKED_MODELS = {
+    Competitor: 'competitor',
+    CompetitorAnalysis: 'competitor_analysis',
+    Analysis: 'analysis',
+}
+
+
+def record_change(instance, action):
+    Change.objects.create(
+        model=TRACKED_MODELS[type(instance)],
+        object_id=instance.pk,
+        action=action,
+        owner_id=instance.created_by_id,
+    )
+
+
+@receiver(post_save, sender=Competitor)
+@receiver(post_save, sender=CompetitorAnalysis)
+@receiver(post_save, sender=Analysis)
+def record_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_change(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Competitor)
+@receiver(post_delete, sender=CompetitorAnalysis)
+@receiver(post_delete, sender=Analysis)
+def record_delete(sender, instance, **kwargs):
+    record_change(instance, 'deleted')
+
+
+@receiver(m2m_changed, sender=Analysis.competitors.through)
+def record_analysis_competitors(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # post_clear has no pk_set, so remember which analyses lose the link.
+        instance._cleared_analysis_ids = list(instance.competitor_analyses.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_cleared_analysis_ids', None)
+        # instance is a Competitor; every affected analysis changed.
+        analyses = Analysis.objects.filter(pk__in=pk_set) if pk_set else []
+        for analysis in analyses:
+            record_change(analysis, 'updated')
+    else:
+        record_change(instance, 'updated')
+
+
+@receiver(pre_delete, sender=Competitor)
+def remember_competitor_analyses(sender, instance, **kwargs):
+    # The cascade removes the through rows without sending m2m_changed.
+    instance._linked_analysis_ids = list(
+        Analysis.objects.filter(competitors=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Competitor)
+def record_competitor_analyses(sender, instance, **kwargs):
+    # Analyses deleted in the same cascade are skipped so their tombstone
+    # stays the last change recorded for them.
+    ids = getattr(instance, '_linked_analysis_ids', None)
+    if ids:
+        for analysis in Analysis.objects.filter(pk__in=ids):
+            record_change(analysis, 'updated')
+
+
+def publish(channels, event):
+    """
+    Push an event to subscribers once the current transaction commits, so
+    clients never fetch data that is not visible yet.
+    """
+    transaction.on_commit(lambda: get_broker().publish(channels, event))
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+@receiver(post_save, sender=CompetitorAnalysis)
+def push_analysis_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    publish(
+        {
+            user_channel(instance.created_by_id),
+            user_channel(instance.competitor.created_by_id),
+            competitor_channel(instance.competitor_id),
+        },
+        {
+            'type': 'analysis.created',
+            'competitor': instance.competitor_id,
+            'analysis': instance.pk,
+            'analysis_date': _isoformat(instance.analysis_date),
+            'sentiment_score': instance.sentiment_score,
+        },
+    )
+
+
+@receiver(post_save, sender=Competitor)
+def push_competitor_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        event_type = 'competitor.created'
+    elif update_fields is not None and 'last_analyzed' in update_fields:
+        event_type = 'competitor.analyzed'
+    else:
+        event_type = 'competitor.updated'
+    publish(
+        {user_channel(instance.created_by_id), competitor_channel(instance.pk)},
+        {
+            'type': event_type,
+            'competitor': instance.pk,
+            'updated_at': _isoformat(instance.updated_at),
+            'last_analyzed': _isoformat(instance.last_analyzed),
+        },
+    )
+
+
+@receiver(post_delete, sender=Competitor)
+def push_competitor_deleted(sender, instance, **kwargs):
+    publish(
+        {user_channel(instance.created_by_id), competitor_channel(instance.pk)},
+        {'type': 'competitor.deleted', 'competitor': instance.pk},
+    )
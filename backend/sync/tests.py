@@ -0,0 +1,290 @@
+import asyncio
+import json
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from analysis.models import Analysis
+from competitors.models import Competitor, CompetitorAnalysis
+from .broker import RESYNC, Broker, InProcessBroker, competitor_channel, get_broker, user_channel
+from .models import Change
+from .push import SSE_PATH, WEBSOCKET_PATH, PushRouter
+
+User = get_user_model()
+
+FEED_URL = '/api/sync/changes/'
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def make_competitor(user, name='Acme'):
+    return Competitor.objects.create(
+        name=name, description='', website='https://example.com', market_position='Leader', created_by=user,
+    )
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class ChangesFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+
+    def sync(self, since=0, **params):
+        response = self.client.get(FEED_URL, {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_returns_changed_objects_and_advances_cursor(self):
+        acme = make_competitor(self.user)
+        analysis = Analysis.objects.create(title='Market', description='', created_by=self.user)
+        analysis.competitors.add(acme)
+
+        page = self.sync()
+        self.assertEqual([item['id'] for item in page['competitors']], [acme.pk])
+        self.assertEqual([item['id'] for item in page['analyses']], [analysis.pk])
+        self.assertFalse(page['has_more'])
+
+        acme.name = 'Acme Corp'
+        acme.save()
+        page = self.sync(page['cursor'])
+        self.assertEqual([item['name'] for item in page['competitors']], ['Acme Corp'])
+        self.assertEqual(page['analyses'], [])
+
+        self.assertEqual(self.sync(page['cursor'])['competitors'], [])
+
+    def test_deleted_objects_become_tombstones(self):
+        acme = make_competitor(self.user)
+        cursor = self.sync()['cursor']
+        acme_id = acme.pk
+        acme.delete()
+
+        page = self.sync(cursor)
+        self.assertEqual(page['competitors'], [])
+        self.assertEqual(page['deleted']['competitors'], [acme_id])
+
+    def test_deleting_a_competitor_updates_its_analyses(self):
+        acme, globex = make_competitor(self.user, 'Acme'), make_competitor(self.user, 'Globex')
+        analysis = Analysis.objects.create(title='Market', description='', created_by=self.user)
+        analysis.competitors.add(acme, globex)
+        cursor = self.sync()['cursor']
+
+        acme.delete()
+        page = self.sync(cursor)
+        self.assertEqual([item['id'] for item in page['analyses']], [analysis.pk])
+        self.assertEqual(page['analyses'][0]['competitors'], [globex.pk])
+
+    def test_clearing_a_competitors_analyses_updates_them(self):
+        acme = make_competitor(self.user)
+        analysis = Analysis.objects.create(title='Market', description='', created_by=self.user)
+        analysis.competitors.add(acme)
+        cursor = self.sync()['cursor']
+
+        acme.competitor_analyses.clear()
+        page = self.sync(cursor)
+        self.assertEqual([item['id'] for item in page['analyses']], [analysis.pk])
+        self.assertEqual(page['analyses'][0]['competitors'], [])
+
+    def test_object_created_and_deleted_in_one_page_is_tombstoned(self):
+        acme = make_competitor(self.user)
+        acme_id = acme.pk
+        acme.delete()
+
+        page = self.sync()
+        self.assertEqual(page['competitors'], [])
+        self.assertEqual(page['deleted']['competitors'], [acme_id])
+
+    def test_pages_with_limit(self):
+        first, second = make_competitor(self.user, 'Acme'), make_competitor(self.user, 'Globex')
+
+        page = self.sync(limit=1)
+        self.assertTrue(page['has_more'])
+        self.assertEqual([item['id'] for item in page['competitors']], [first.pk])
+
+        page = self.sync(page['cursor'], limit=1)
+        self.assertFalse(page['has_more'])
+        self.assertEqual([item['id'] for item in page['competitors']], [second.pk])
+
+    def test_only_own_changes_are_returned(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        make_competitor(other)
+        page = self.sync()
+        self.assertEqual(page['competitors'], [])
+        self.assertEqual(page['cursor'], 0)
+
+    def test_other_users_objects_and_tombstones_are_not_returned(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        globex = make_competitor(other, 'Globex')
+        CompetitorAnalysis.objects.create(competitor=globex, created_by=other, ai_insights='')
+        analysis = Analysis.objects.create(title='Market', description='', created_by=other)
+        analysis.competitors.add(globex)
+        make_competitor(other, 'Initech').delete()
+        acme = make_competitor(self.user)
+
+        page = self.sync()
+        self.assertEqual([item['id'] for item in page['competitors']], [acme.pk])
+        self.assertEqual(page['competitor_analyses'], [])
+        self.assertEqual(page['analyses'], [])
+        self.assertEqual(page['deleted'], {'competitors': [], 'competitor_analyses': [], 'analyses': []})
+
+        page = client_for(other).get(FEED_URL).data
+        self.assertEqual([item['name'] for item in page['competitors']], ['Globex'])
+        self.assertEqual(len(page['deleted']['competitors']), 1)
+
+    def test_rejects_non_integer_cursor(self):
+        response = self.client.get(FEED_URL, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=60)
+class UnsettledChangesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client = client_for(self.user)
+
+    def test_cursor_is_held_before_recent_changes(self):
+        acme = make_competitor(self.user)
+
+        page = self.client.get(FEED_URL).data
+        self.assertEqual([item['id'] for item in page['competitors']], [acme.pk])
+        self.assertEqual(page['cursor'], 0)
+        self.assertFalse(page['has_more'])
+
+    def test_change_committed_late_is_not_skipped(self):
+        acme = make_competitor(self.user, 'Acme')
+        make_competitor(self.user, 'Globex')
+
+        # Acme's change has the lower id but its transaction has not
+        # committed yet when the client syncs.
+        pending = Change.objects.get(model='competitor', object_id=acme.pk)
+        pending.delete()
+        page = self.client.get(FEED_URL).data
+        self.assertEqual([item['name'] for item in page['competitors']], ['Globex'])
+
+        pending.save()
+        page = self.client.get(FEED_URL, {'since': page['cursor']}).data
+        self.assertEqual(sorted(item['name'] for item in page['competitors']), ['Acme', 'Globex'])
+
+
+class BrokerTests(SimpleTestCase):
+    def test_broker_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Broker()
+
+    async def test_delivers_once_to_matching_subscriptions(self):
+        broker = InProcessBroker(queue_size=10)
+        both = broker.subscribe({user_channel(1), competitor_channel(7)})
+        other = broker.subscribe({user_channel(2)})
+
+        broker.publish({user_channel(1), competitor_channel(7)}, {'type': 'competitor.updated'})
+        self.assertEqual(await both.get(1), {'type': 'competitor.updated'})
+        self.assertIsNone(await both.get(0.05))
+        self.assertIsNone(await other.get(0.05))
+
+        both.close()
+        other.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_slow_subscriber_gets_resync(self):
+        broker = InProcessBroker(queue_size=2)
+        subscription = broker.subscribe({user_channel(1)})
+        for index in range(3):
+            broker.publish({user_channel(1)}, {'type': 'competitor.updated', 'competitor': index})
+        await asyncio.sleep(0)
+
+        self.assertEqual(await subscription.get(1), RESYNC)
+        self.assertIsNone(await subscription.get(0.05))
+        subscription.close()
+
+
+class PushEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+
+    def test_changes_are_published_after_commit(self):
+        with mock.patch('sync.signals.get_broker') as get_broker_mock:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                acme = make_competitor(self.user)
+            get_broker_mock.return_value.publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        get_broker_mock.return_value.publish.assert_called_once_with(
+            {user_channel(self.user.pk), competitor_channel(acme.pk)},
+            mock.ANY,
+        )
+        event = get_broker_mock.return_value.publish.call_args.args[1]
+        self.assertEqual(event['type'], 'competitor.created')
+        self.assertEqual(event['competitor'], acme.pk)
+
+
+class PushRouterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.token = str(AccessToken.for_user(self.user))
+        self.router = PushRouter(mock.AsyncMock())
+
+    def scope(self, type, path, query=''):
+        scope = {'type': type, 'path': path, 'query_string': query.encode('latin-1'), 'headers': []}
+        if type == 'http':
+            scope['method'] = 'GET'
+        return scope
+
+    async def call(self, scope, *messages):
+        incoming = list(messages)
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await asyncio.wait_for(self.router(scope, receive, send), 5)
+        return sent
+
+    async def test_websocket_rejects_missing_or_invalid_token(self):
+        for query in ('', 'token=invalid'):
+            with self.subTest(query=query):
+                sent = await self.call(self.scope('websocket', WEBSOCKET_PATH, query), {'type': 'websocket.connect'})
+                self.assertEqual(sent, [{'type': 'websocket.close', 'code': 4401}])
+
+    async def test_sse_rejects_missing_token_and_foreign_competitors(self):
+        sent = await self.call(self.scope('http', SSE_PATH))
+        self.assertEqual(sent[0]['status'], 401)
+
+        other = await User.objects.acreate(username='bob', email='bob@example.com')
+        foreign = await Competitor.objects.acreate(
+            name='Initech', description='', website='https://example.com', market_position='Leader',
+            created_by=other,
+        )
+        sent = await self.call(self.scope('http', SSE_PATH, f'token={self.token}&competitor={foreign.pk}'))
+        self.assertEqual(sent[0]['status'], 400)
+        self.assertEqual(json.loads(sent[1]['body']), {'error': 'Unknown competitor ids'})
+
+    async def test_websocket_streams_user_events(self):
+        incoming = asyncio.Queue()
+        sent = asyncio.Queue()
+        await incoming.put({'type': 'websocket.connect'})
+        task = asyncio.ensure_future(
+            self.router(self.scope('websocket', WEBSOCKET_PATH, f'token={self.token}'), incoming.get, sent.put)
+        )
+        self.assertEqual(await asyncio.wait_for(sent.get(), 5), {'type': 'websocket.accept'})
+
+        event = {'type': 'competitor.updated', 'competitor': 1}
+        get_broker().publish({user_channel(self.user.pk)}, event)
+        message = await asyncio.wait_for(sent.get(), 5)
+        self.assertEqual(json.loads(message['text']), event)
+
+        await incoming.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+    async def test_other_requests_go_to_django(self):
+        scope = self.scope('http', '/api/competitors/')
+        await self.call(scope)
+        self.router.django_application.assert_awaited_once()
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import ChangesViewSet
+
+router = DefaultRouter()
+router.register(r'changes', ChangesViewSet, basename='changes')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
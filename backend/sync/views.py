@@ -0,0 +1,94 @@
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from analysis.models import Analysis
+from analysis.serializers import AnalysisSerializer
+from competitors.models import Competitor, CompetitorAnalysis
+from competitors.serializers import CompetitorSerializer, CompetitorAnalysisSerializer
+from .models import Change
+
+# model name -> (response key, queryset, serializer)
+FEEDS = {
+    'competitor': ('competitors', Competitor.objects.all(), CompetitorSerializer),
+    'competitor_analysis': (
+        'competitor_analyses',
+        CompetitorAnalysis.objects.select_related('competitor'),
+        CompetitorAnalysisSerializer,
+    ),
+    'analysis': ('analyses', Analysis.objects.prefetch_related('competitors'), AnalysisSerializer),
+}
+
+
+class ChangesViewSet(viewsets.ViewSet):
+    """
+    Incremental sync feed. Returns the requesting user's competitors,
+    competitor analyses and analyses created or updated since a cursor,
+    plus tombstones for deleted ones. Pass the returned cursor as ?since=
+    on the next call and keep calling while has_more is true.
+
+    Changes from the last SYNC_SETTLE_SECONDS are returned again on the
+    next call, so clients must treat objects and tombstones as idempotent.
+    A change whose transaction takes longer than that to commit can still
+    be missed.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {'error': 'since and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.SYNC_MAX_PAGE_SIZE))
+
+        changes = list(
+            Change.objects.filter(owner_id=request.user.pk, id__gt=since).order_by('id')
+            .values_list('id', 'model', 'object_id', 'action', 'changed_at')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # A transaction can commit its change after one with a higher id is
+        # already visible. Recent changes are returned but the cursor stays
+        # before them, so the next call returns them again together with
+        # any earlier ids committed in the meantime.
+        settled = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+        cursor = since
+        for change_id, _, _, _, changed_at in changes:
+            if changed_at > settled:
+                break
+            cursor = change_id
+
+        # Collapse to the latest action per object.
+        last_action = {}
+        for _, model, object_id, action, _ in changes:
+            last_action[(model, object_id)] = action
+
+        upserted = {model: [] for model in FEEDS}
+        deleted = {model: [] for model in FEEDS}
+        for (model, object_id), action in last_action.items():
+            if action == 'deleted':
+                # Sent even if the object was created in this page: an
+                # earlier page may have returned it before the cursor moved.
+                deleted[model].append(object_id)
+            else:
+                upserted[model].append(object_id)
+
+        data = {
+            'cursor': cursor,
+            # Stop paging while only unsettled changes remain.
+            'has_more': has_more and cursor > since,
+        }
+        for model, (key, queryset, serializer_class) in FEEDS.items():
+            objects = (
+                queryset.filter(pk__in=upserted[model], created_by=request.user)
+                if upserted[model] else []
+            )
+            data[key] = serializer_class(objects, many=True).data
+        data['deleted'] = {key: sorted(deleted[model]) for model, (key, _, _) in FEEDS.items()}
+        return Response(data)
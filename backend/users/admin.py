@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, UsageLedger
 
-admin.site.register(CustomUser, UserAdmin) 
\ No newline at end of file
+admin.site.register(CustomUser, UserAdmin)
+admin.site.register(UsageLedger)
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_PREFIX = 'users:auth'
+
+# Backends whose entries are private to one process.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def user_cache_enabled():
+    """
+    Return True if cached users can be invalidated in every process.
+    """
+    backend = settings.CACHES[settings.AUTH_USER_CACHE_ALIAS]['BACKEND']
+    return backend not in LOCAL_CACHE_BACKENDS or settings.AUTH_USER_CACHE_ALLOW_LOCAL
+
+
+def _version_key(user_id):
+    return f'{USER_CACHE_PREFIX}:version:{user_id}'
+
+
+def _user_key(user_id, version):
+    return f'{USER_CACHE_PREFIX}:user:{user_id}:{version}'
+
+
+def invalidate_cached_user(user_id):
+    """
+    Bump the cached token version for a user so that any cached copy is
+    ignored on the next request.
+    """
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No version stored yet, so there is nothing cached to invalidate.
+        cache.set(_version_key(user_id), 1, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user from the cache instead of
+    querying the database on every request.
+
+    Cached users are keyed by user id and a per-user version which is bumped
+    whenever the user is saved, so stale copies are never served. Users
+    are only cached in a cache shared by all worker processes; otherwise
+    every request reads the user from the database.
+    """
+
+    def get_user(self, validated_token):
+        if not user_cache_enabled():
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache = _cache()
+        version = cache.get_or_set(_version_key(user_id), 0, None)
+        key = _user_key(user_id, version)
+        user = cache.get(key)
+
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
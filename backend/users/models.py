@@ -12,4 +12,25 @@ class CustomUser(AbstractUser):
     last_login_ip = models.GenericIPAddressField(null=True, blank=True)
     
     def __str__(self):
-        return self.email 
\ No newline at end of file
+        return self.email
+
+class UsageLedger(models.Model):
+    """
+    Daily Gemini usage per user. Quota checks read shared cached counters
+    seeded from this table, or this table itself when no shared cache is
+    configured.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='usage')
+    day = models.DateField()
+    requests = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} on {self.day}"
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_usage_per_day'),
+        ]
@@ -0,0 +1,122 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from .authentication import LOCAL_CACHE_BACKENDS
+from .models import UsageLedger
+
+
+class QuotaExceeded(Throttled):
+    default_detail = 'Daily AI quota exceeded.'
+    default_code = 'quota_exceeded'
+
+
+def _counter_keys(user_id, day):
+    prefix = f'quota:{user_id}:{day.isoformat()}'
+    return f'{prefix}:requests', f'{prefix}:tokens'
+
+
+def _seconds_until_tomorrow():
+    now = timezone.localtime()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+    return int((tomorrow - now).total_seconds()) + 1
+
+
+def _cache():
+    return caches[settings.QUOTA_CACHE_ALIAS]
+
+
+def counters_cached():
+    """
+    Return True if the quota counters are shared by every worker process.
+    A per-process cache would let each worker count only its own calls, so
+    the ledger is read instead.
+    """
+    return settings.CACHES[settings.QUOTA_CACHE_ALIAS]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def _ledger_counters(user_id, day):
+    ledger = UsageLedger.objects.filter(user_id=user_id, day=day).first()
+    if ledger is None:
+        return 0, 0
+    return ledger.requests, ledger.prompt_tokens + ledger.completion_tokens
+
+
+def _counters(user_id, day):
+    """
+    Return (requests, tokens) used today, seeding the cached counters from
+    the ledger the first time they are needed.
+    """
+    if not counters_cached():
+        return _ledger_counters(user_id, day)
+
+    cache = _cache()
+    requests_key, tokens_key = _counter_keys(user_id, day)
+    values = cache.get_many([requests_key, tokens_key])
+    if len(values) == 2:
+        return values[requests_key], values[tokens_key]
+
+    requests, tokens = _ledger_counters(user_id, day)
+    timeout = _seconds_until_tomorrow()
+    cache.add(requests_key, requests, timeout)
+    cache.add(tokens_key, tokens, timeout)
+    return cache.get(requests_key, requests), cache.get(tokens_key, tokens)
+
+
+def check_quota(user):
+    """
+    Raise QuotaExceeded if the user has used up their daily quota.
+    """
+    if user is None or not user.is_authenticated:
+        return
+    quota = settings.LLM_DAILY_QUOTAS.get(user.role)
+    if not quota:
+        return
+    requests, tokens = _counters(user.pk, timezone.localdate())
+    if (
+        (quota.get('requests') is not None and requests >= quota['requests'])
+        or (quota.get('tokens') is not None and tokens >= quota['tokens'])
+    ):
+        raise QuotaExceeded(wait=_seconds_until_tomorrow())
+
+
+def record_usage(user, prompt_tokens, completion_tokens, requests=1):
+    """
+    Add one call's usage to the cached counters and the ledger.
+    """
+    if user is None or not user.is_authenticated:
+        return
+    day = timezone.localdate()
+    if counters_cached():
+        cache = _cache()
+        requests_key, tokens_key = _counter_keys(user.pk, day)
+        _counters(user.pk, day)
+        for key, amount in ((requests_key, requests), (tokens_key, prompt_tokens + completion_tokens)):
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                pass
+
+    updated = UsageLedger.objects.filter(user=user, day=day).update(
+        requests=F('requests') + requests,
+        prompt_tokens=F('prompt_tokens') + prompt_tokens,
+        completion_tokens=F('completion_tokens') + completion_tokens,
+    )
+    if not updated:
+        ledger, created = UsageLedger.objects.get_or_create(
+            user=user,
+            day=day,
+            defaults={
+                'requests': requests,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+            },
+        )
+        if not created:
+            UsageLedger.objects.filter(pk=ledger.pk).update(
+                requests=F('requests') + requests,
+                prompt_tokens=F('prompt_tokens') + prompt_tokens,
+                completion_tokens=F('completion_tokens') + completion_tokens,
+            )
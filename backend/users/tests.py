@@ -0,0 +1,132 @@
+import tempfile
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import CachedJWTAuthentication
+from .models import CustomUser
+from .quotas import QuotaExceeded, check_quota, record_usage
+
+
+def clear_caches():
+    for alias in ('default', 'shared', 'responses'):
+        caches[alias].clear()
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.authentication = CachedJWTAuthentication()
+        self.token = self.authentication.get_validated_token(str(AccessToken.for_user(self.user)))
+
+    @override_settings(AUTH_USER_CACHE_ALLOW_LOCAL=True)
+    def test_cached_user_needs_no_query(self):
+        self.authentication.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+        self.assertEqual(user.pk, self.user.pk)
+
+    @override_settings(AUTH_USER_CACHE_ALLOW_LOCAL=True)
+    def test_deactivation_invalidates_cached_user(self):
+        self.authentication.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    @override_settings(AUTH_USER_CACHE_ALLOW_LOCAL=False)
+    def test_per_process_cache_is_not_used(self):
+        self.authentication.get_user(self.token)
+        with self.assertNumQueries(1):
+            self.authentication.get_user(self.token)
+
+        # Another process deactivating the user cannot reach this cache, so
+        # the user must be read from the database again.
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+
+@override_settings(AUTH_USER_CACHE_ALLOW_LOCAL=True)
+class ChangePasswordTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='old')
+        self.client = client_for(self.user)
+        # Warm the auth cache with the current copy of the user.
+        self.client.get('/api/users/users/me/')
+
+    def test_does_not_overwrite_newer_fields(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(company_name='Acme')
+
+        response = self.client.post(
+            '/api/users/users/change_password/',
+            {'current_password': 'old', 'new_password': 'new-password-123'},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.company_name, 'Acme')
+        self.assertTrue(self.user.check_password('new-password-123'))
+
+    def test_rejects_wrong_current_password(self):
+        response = self.client.post(
+            '/api/users/users/change_password/',
+            {'current_password': 'wrong', 'new_password': 'new-password-123'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+def worker_caches(backend, location_a, location_b):
+    return {
+        **settings.CACHES,
+        'worker_a': {'BACKEND': backend, 'LOCATION': location_a},
+        'worker_b': {'BACKEND': backend, 'LOCATION': location_b},
+    }
+
+
+@override_settings(LLM_DAILY_QUOTAS={'viewer': {'requests': 2, 'tokens': None}})
+class QuotaTests(TestCase):
+    """
+    Each worker process is simulated by pointing QUOTA_CACHE_ALIAS at its
+    own cache instance; both share the ledger through the database.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='pw')
+
+    def use_on(self, alias):
+        with self.settings(QUOTA_CACHE_ALIAS=alias):
+            check_quota(self.user)
+            record_usage(self.user, 10, 5)
+
+    def assert_quota_shared_between_workers(self):
+        self.use_on('worker_a')
+        self.use_on('worker_b')
+        for alias in ('worker_a', 'worker_b'):
+            with self.settings(QUOTA_CACHE_ALIAS=alias), self.assertRaises(QuotaExceeded):
+                check_quota(self.user)
+
+    def test_per_process_caches_read_the_ledger(self):
+        with self.settings(CACHES=worker_caches('django.core.cache.backends.locmem.LocMemCache', 'a', 'b')):
+            self.assert_quota_shared_between_workers()
+
+    def test_shared_cache_counts_every_worker(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = 'django.core.cache.backends.filebased.FileBasedCache'
+            with self.settings(CACHES=worker_caches(backend, location, location)):
+                # Seed worker_b's counters before worker_a records its call.
+                with self.settings(QUOTA_CACHE_ALIAS='worker_b'):
+                    check_quota(self.user)
+                self.assert_quota_shared_between_workers()
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from .serializers import UserSerializer, UserCreateSerializer
+from rivalradar.response_cache import cached_response
 
 User = get_user_model()
 
@@ -22,13 +23,16 @@ class UserViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     @action(detail=False, methods=['get'])
+    @cached_response('users_me', depends_on=['users'])
     def me(self, request):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
     def change_password(self, request):
-        user = request.user
+        # request.user may be a cached copy; write to a fresh instance so
+        # newer changes to other fields are not overwritten.
+        user = User.objects.get(pk=request.user.pk)
         current_password = request.data.get('current_password')
         new_password = request.data.get('new_password')
 
@@ -39,5 +43,5 @@ class UserViewSet(viewsets.ModelViewSet):
             )
 
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
         return Response({'message': 'Password successfully changed'}) 
\ No newline at end of file